@@ -1,12 +1,9 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import streamlit.components.v1 as components
-from utilities import *
-import plotly.express as px
-import threading
+from perf import debug_panel, span, start_rerun
+import time
 
 st.set_page_config(page_title="Chicago Crash Dashboard", layout="wide", initial_sidebar_state="collapsed")
+start_rerun()
 
 # Custom CSS
 st.markdown("""
@@ -41,35 +38,58 @@ st.markdown("""
 
 st.title("Chicago Crash Dashboard")
 
-if 'combined_df' not in st.session_state:
-    st.session_state['combined_df'] = preprocess_crash_data(load_crash_data_with_progress())   
-
-combined_df = st.session_state['combined_df']
-
-if 'map_html' not in st.session_state:
-    def preload_map():
-        st.session_state['map_html'] = load_large_html_map()
-
-    threading.Thread(target=preload_map).start()
+# The data and plotting modules are imported once the title is on screen
+import pandas as pd
+import plotly.graph_objects as go
+from utilities import *
+from rollups import SEVERITY_CLASSES, slice_rollup
+from preload import scheduler
+from figures import figure_cache, plotly_chart
+
+# Charts render from whatever the background loader has read so far and
+# refine on each rerun until the full dataset is in
+loader = get_dataset_loader()
+# Read before the rollups, so a refresh in between can't file older figures
+# under the newer generation
+generation = loader.generation
+rollups, rollups_complete = loader.partial_rollups()
+if rollups is None:
+    with st.spinner("Loading the most recent crash data..."):
+        while rollups is None and not loader.done:
+            time.sleep(0.1)
+            rollups, rollups_complete = loader.partial_rollups()
+    if rollups is None:
+        rollups = load_shared_dataset().rollups
+if loader.done:
+    load_shared_dataset().attach()
+if not rollups_complete:
+    st.info(f"Showing partial data: {loader.rows_loaded:,} crashes loaded so far, "
+            f"most recent first. Charts refine as the rest arrives.")
+    st.progress(loader.progress)
 
 # Sidebar Filters
 st.sidebar.header("Filter Data")
-start_date = st.sidebar.date_input("Start Date", pd.to_datetime('2020-01-01'))
-end_date = st.sidebar.date_input("End Date", pd.to_datetime('2025-01-01'))
-weather_condition = st.sidebar.selectbox("Select Weather Condition", ['All'] + list(combined_df['WEATHER_CONDITION'].dropna().unique()))
+start_date = st.sidebar.date_input("Start Date", DEFAULT_FILTERS[0])
+end_date = st.sidebar.date_input("End Date", DEFAULT_FILTERS[1])
+weather_condition = st.sidebar.selectbox("Select Weather Condition", ['All'] + list(rollups['base']['WEATHER_CONDITION'].dropna().unique()))
 severity = st.sidebar.selectbox("Select Crash Severity", ['All', 'Minor', 'Moderate', 'Severe'])
 
-filtered_df = filter_data(combined_df, start_date, end_date, weather_condition, severity)
-st.session_state['filtered_df'] = filtered_df
+# Every chart below reads a pre-aggregated rollup slice instead of raw rows
+base, by_hour, by_lighting, by_damage = (
+    slice_rollup(rollups[name], start_date, end_date, weather_condition, severity)
+    for name in ['base', 'hour', 'lighting', 'damage']
+)
+st.session_state['crash_filters'] = (start_date, end_date, weather_condition, severity)
 
 # Metrics
 col1, col2, col3 = st.columns([2, 3, 3])
-with col1:
+with col1, span('home.metrics'):
     st.markdown("### Key Metrics")
-    total_crashes = len(filtered_df)
-    total_injuries = filtered_df['INJURIES_TOTAL'].sum()
-    avg_speed_limit = filtered_df['POSTED_SPEED_LIMIT'].mean()
-    total_damage = filtered_df['DAMAGE_VALUE'].sum()
+    total_crashes = base['count'].sum()
+    total_injuries = base['injuries'].sum()
+    speed_count = base['speed_count'].sum()
+    avg_speed_limit = base['speed_sum'].sum() / speed_count if speed_count else float('nan')
+    total_damage = base['damage'].sum()
     total_damage = f"{total_damage / 1_000_000:.2f}M"
 
     metrics = [
@@ -87,43 +107,49 @@ with col1:
         """, unsafe_allow_html=True)
         st.write("")
 
+# Figures are cached per data generation and filter state once
+# the rollups are complete
+figure_key = (generation, start_date, end_date, weather_condition, severity)
+
 # Crash Severity Pie
-with col2:
+with col2, span('figure.severity_pie'):
     st.markdown("### Crash Severity Breakdown")
-    fig = go.Figure(data=[go.Pie(labels=['No Injuries', 'Injuries'],
-                                 values=[(filtered_df['INJURIES_TOTAL']==0).sum(), (filtered_df['INJURIES_TOTAL']>0).sum()],
-                                 hole=.3,
-                                 marker_colors=['#4cc9f0', '#f72585'])])
-    fig.update_layout(title_text="Crashes with Injuries vs No Injuries", legend_orientation="h", legend=dict(x=0.5, xanchor="center"),
-                      plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
-    st.plotly_chart(fig, use_container_width=True)
+
+    def severity_pie():
+        fig = go.Figure(data=[go.Pie(labels=['No Injuries', 'Injuries'],
+                                     values=[base.loc[base['SEVERITY'] == SEVERITY_CLASSES['Minor'], 'count'].sum(),
+                                             base.loc[base['SEVERITY'] > SEVERITY_CLASSES['Minor'], 'count'].sum()],
+                                     hole=.3,
+                                     marker_colors=['#4cc9f0', '#f72585'])])
+        fig.update_layout(title_text="Crashes with Injuries vs No Injuries", legend_orientation="h", legend=dict(x=0.5, xanchor="center"),
+                          plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)', font=dict(color='white'))
+        return fig
+    plotly_chart('home.severity_pie', figure_key, severity_pie, cached=rollups_complete, use_container_width=True)
 
 # Damage Cost Bar
-with col3:
+with col3, span('figure.damage_bar'):
     st.markdown("### Economic Impact")
-    damage_summary = filtered_df.groupby('DAMAGE_CATEGORY')['DAMAGE_VALUE'].sum().sort_values(ascending=True)
-    fig = go.Figure(go.Bar(x=damage_summary.values, y=damage_summary.index, orientation='h', marker_color='#4cc9f0'))
-    fig.update_layout(title='Damage Cost by Category', xaxis_title='Total Damage Cost ($)', yaxis_title='Damage Category',
-                      font=dict(color='white'), plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
-    st.plotly_chart(fig, use_container_width=True)
-
 
-    
+    def damage_bar():
+        damage_summary = by_damage.groupby('DAMAGE_CATEGORY', observed=True)['damage'].sum().sort_values(ascending=True)
+        fig = go.Figure(go.Bar(x=damage_summary.values, y=damage_summary.index, orientation='h', marker_color='#4cc9f0'))
+        fig.update_layout(title='Damage Cost by Category', xaxis_title='Total Damage Cost ($)', yaxis_title='Damage Category',
+                          font=dict(color='white'), plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+        return fig
+    plotly_chart('home.damage_bar', figure_key, damage_bar, cached=rollups_complete, use_container_width=True)
 
-# Crash Map
-# st.markdown("### Crash Hotspot Map")
-# html_data = load_map_html()
-# components.html(html_data, height=700, scrolling=False)
 
+    
 
 st.markdown("### Time-based Analysis")
 
 col4, col5 = st.columns(2)
 
-with col4:
+with col4, span('figure.hour_bar'):
     st.markdown("#### Crashes by Hour")
-    if 'CRASH_HOUR' in filtered_df.columns:
-        hour_counts = filtered_df['CRASH_HOUR'].value_counts().sort_index()
+
+    def hour_bar():
+        hour_counts = by_hour.groupby('CRASH_HOUR')['count'].sum()
         all_hours = pd.Series(range(24))
         hour_counts = hour_counts.reindex(all_hours, fill_value=0)
 
@@ -137,15 +163,17 @@ with col4:
             font=dict(color='white'),
             xaxis=dict(tickmode='array', tickvals=list(range(0, 24, 4)), ticktext=[f'{i:02d}:00' for i in range(0, 24, 4)]),
         )
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
+    plotly_chart('home.hour_bar', figure_key, hour_bar, cached=rollups_complete, use_container_width=True)
 
-with col5:
+with col5, span('figure.month_bar'):
     st.markdown("#### Crashes by Month")
-    if 'CRASH_MONTH' in filtered_df.columns:
-        month_counts = filtered_df['CRASH_MONTH'].value_counts().sort_index()
+
+    def month_bar():
+        month_counts = base.groupby('CRASH_MONTH')['count'].sum()
         all_months = pd.Series(range(1, 13))
         month_counts = month_counts.reindex(all_months, fill_value=0)
-        
+
         fig = go.Figure(data=[go.Bar(x=month_counts.index, y=month_counts.values, marker_color='#4cc9f0')])
         fig.update_layout(
             title='Crashes by Month',
@@ -156,25 +184,50 @@ with col5:
             font=dict(color='white'),
             xaxis=dict(tickmode='array', tickvals=list(range(1, 13)), ticktext=['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']),
         )
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
+    plotly_chart('home.month_bar', figure_key, month_bar, cached=rollups_complete, use_container_width=True)
 
 # Weather and Lighting Condition Breakdown
 st.markdown("### Weather and Lighting Conditions")
 
 col6, col7 = st.columns(2)
 
-with col6:
+with col6, span('figure.weather_bar'):
     st.markdown("#### Weather Condition Breakdown")
-    weather_counts = filtered_df['WEATHER_CONDITION'].value_counts()
-    fig_weather = go.Figure(go.Bar(x=weather_counts.index, y=weather_counts.values, marker_color='#7209b7'))
-    fig_weather.update_layout(title='Crashes by Weather Condition', xaxis_title='Weather', yaxis_title='Crashes', font=dict(color='white'),
-    plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
-    st.plotly_chart(fig_weather, use_container_width=True)
 
-with col7:
+    def weather_bar():
+        weather_counts = base.groupby('WEATHER_CONDITION', observed=True)['count'].sum().sort_values(ascending=False)
+        fig_weather = go.Figure(go.Bar(x=weather_counts.index, y=weather_counts.values, marker_color='#7209b7'))
+        fig_weather.update_layout(title='Crashes by Weather Condition', xaxis_title='Weather', yaxis_title='Crashes', font=dict(color='white'),
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)')
+        return fig_weather
+    plotly_chart('home.weather_bar', figure_key, weather_bar, cached=rollups_complete, use_container_width=True)
+
+with col7, span('figure.lighting_pie'):
     st.markdown("#### Lighting Condition Breakdown")
-    light_counts = filtered_df['LIGHTING_CONDITION'].value_counts()
-    fig_light = go.Figure(go.Pie(labels=light_counts.index, values=light_counts.values, marker_colors=['#560bad','#f72585','#4cc9f0']))
-    fig_light.update_layout(title='Lighting Conditions During Crashes', font=dict(color='white'),
-    paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
-    st.plotly_chart(fig_light, use_container_width=True)
+
+    def lighting_pie():
+        light_counts = by_lighting.groupby('LIGHTING_CONDITION', observed=True)['count'].sum().sort_values(ascending=False)
+        fig_light = go.Figure(go.Pie(labels=light_counts.index, values=light_counts.values, marker_colors=['#560bad','#f72585','#4cc9f0']))
+        fig_light.update_layout(title='Lighting Conditions During Crashes', font=dict(color='white'),
+        paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+        return fig_light
+    plotly_chart('home.lighting_pie', figure_key, lighting_pie, cached=rollups_complete, use_container_width=True)
+
+with st.sidebar.expander("Preload Status"):
+    st.dataframe(pd.DataFrame(scheduler.status()), hide_index=True)
+    if loader.dataset is not None:
+        st.caption("Shared dataset")
+        st.dataframe(pd.DataFrame([{'sessions attached': loader.dataset.session_count, 'rows': loader.rows_loaded,
+                                    'generation': loader.generation}]), hide_index=True)
+    st.caption("Figure cache")
+    st.dataframe(pd.DataFrame([figure_cache.stats()]), hide_index=True)
+
+debug_panel()
+loader.mark_first_chart()
+# Warm the map grid and configured models in the background (once per
+# process), after the first charts so they don't compete with them
+start_preloads()
+if not rollups_complete:
+    time.sleep(1)
+    st.rerun()
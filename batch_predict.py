@@ -0,0 +1,75 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from encoders import EncoderSet, fallback_classes
+from model_registry import registry
+
+# Crash-type models that take label-encoded inputs
+CRASH_TYPE_MODELS = ['random_forest', 'categoricalNB', 'lightGBM']
+
+INPUT_COLS = ['POSTED_SPEED_LIMIT', 'WEATHER_CONDITION', 'LIGHTING_CONDITION',
+              'TRAFFICWAY_TYPE', 'ALIGNMENT',
+              'ROADWAY_SURFACE_COND', 'ROAD_DEFECT', 'PRIM_CONTRIBUTORY_CAUSE',
+              'SEC_CONTRIBUTORY_CAUSE', 'CRASH_HOUR', 'CRASH_DAY_OF_WEEK',
+              'CRASH_MONTH', 'MANEUVER', 'SEX', 'AGE']
+TARGET_COL = 'FIRST_CRASH_TYPE'
+PREDICTION_COL = 'PREDICTED_CRASH_TYPE'
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def with_fallback(encoders, unknown):
+    # Encoders that score values they never saw as `unknown` (see
+    # encoders.fallback_classes) instead of rejecting the whole batch
+    if not isinstance(encoders, EncoderSet):
+        encoders = EncoderSet(encoders)
+    if unknown is None:
+        return encoders
+    return EncoderSet(encoders.label_encoders, encoders.columns, fallback_classes(encoders.label_encoders, unknown))
+
+
+def load_crash_type_model(name, unknown=None):
+    return registry.get(name), with_fallback(registry.get(name, 'encoders'), unknown)
+
+
+def predict_batch(df, model, encoders, chunk_size=DEFAULT_CHUNK_SIZE, unknown=None):
+    encoders = with_fallback(encoders, unknown)
+    predictions = []
+    for start in range(0, len(df), chunk_size):
+        chunk = encoders.encode_frame(df.iloc[start:start + chunk_size], INPUT_COLS)
+        predictions.append(model.predict(chunk))
+    if not predictions:
+        return pd.Series([], index=df.index, dtype=object, name=PREDICTION_COL)
+    labels = encoders.decode(TARGET_COL, np.concatenate(predictions))
+    return pd.Series(labels, index=df.index, name=PREDICTION_COL)
+
+
+def predict_csv(input_path, output_path, model_name='random_forest', chunk_size=DEFAULT_CHUNK_SIZE, unknown=None):
+    model, encoders = load_crash_type_model(model_name, unknown)
+    rows = 0
+    start = time.perf_counter()
+    # dtype=str keeps the values exactly as written, which is how the
+    # encoders were fit (astype(str) on the training frame)
+    reader = pd.read_csv(input_path, dtype=str, chunksize=chunk_size)
+    for i, chunk in enumerate(reader):
+        chunk[PREDICTION_COL] = predict_batch(chunk, model, encoders, chunk_size)
+        chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        rows += len(chunk)
+    seconds = time.perf_counter() - start
+    return rows, seconds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score a CSV of crash reports with a crash-type model.')
+    parser.add_argument('input')
+    parser.add_argument('-o', '--output', default='predictions.csv')
+    parser.add_argument('--model', choices=CRASH_TYPE_MODELS, default='random_forest')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--unknown', metavar='LABEL',
+                        help='score values the encoders never saw as LABEL (e.g. UNKNOWN) instead of failing, '
+                             'in the columns that have that class; unseen values elsewhere still fail')
+    args = parser.parse_args()
+    rows, seconds = predict_csv(args.input, args.output, args.model, args.chunk_size, args.unknown)
+    print(f"Scored {rows:,} rows with {args.model} in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/sec)")
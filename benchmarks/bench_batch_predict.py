@@ -0,0 +1,53 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_predict import CRASH_TYPE_MODELS, INPUT_COLS, TARGET_COL, load_crash_type_model, predict_batch
+
+
+def custom_predict(model, label_encoders, new_sample):
+    # models/random_forest/RFclassifier.py::custom_predict, one row per call
+    new_df = pd.DataFrame([new_sample])
+    for col in INPUT_COLS:
+        new_df[col] = label_encoders[col].transform(new_df[col].astype(str))
+    prediction = model.predict(new_df)
+    return label_encoders[TARGET_COL].inverse_transform(prediction)[0]
+
+
+def sample_inputs(label_encoders, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        col: label_encoders[col].classes_[rng.integers(0, len(label_encoders[col].classes_), n_rows)]
+        for col in INPUT_COLS
+    })
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', choices=CRASH_TYPE_MODELS, default='random_forest')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--loop-rows', type=int, default=500)
+    args = parser.parse_args()
+
+    model, encoders = load_crash_type_model(args.model)
+    label_encoders = encoders.label_encoders
+    df = sample_inputs(label_encoders, args.rows)
+
+    start = time.perf_counter()
+    looped = [custom_predict(model, label_encoders, row) for row in df.head(args.loop_rows).to_dict('records')]
+    loop_rate = args.loop_rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    batched = predict_batch(df, model, encoders)
+    batch_rate = args.rows / (time.perf_counter() - start)
+
+    assert list(batched.head(args.loop_rows)) == looped
+    print(f'{args.model}')
+    print(f'custom_predict loop: {loop_rate:12,.0f} rows/sec')
+    print(f'predict_batch:       {batch_rate:12,.0f} rows/sec  ({batch_rate / loop_rate:.0f}x)')
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import timeit
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from encoders import EncoderSet, fallback_classes, fallback_columns
+
+ARTIFACTS = [
+    'models/random_forest/RF_encoders.joblib',
+    'models/categoricalNB/NB_encoders.joblib',
+    'models/lightGBM/LGBM_encoders.joblib',
+    'models/riskModel/encoders.pkl',
+]
+
+
+def check_equivalence(label_encoders, compiled, n_samples=10_000, seed=0):
+    # Codes must match LabelEncoder.transform exactly, one value at a time and
+    # for a whole column, and decoding must round-trip
+    rng = np.random.default_rng(seed)
+    for col, le in label_encoders.items():
+        classes = le.classes_
+        expected = le.transform(classes)
+        assert [compiled[col].encode(v) for v in classes] == list(expected), col
+        sample = classes[rng.integers(0, len(classes), n_samples)]
+        np.testing.assert_array_equal(compiled[col].encode_many(pd.Series(sample)), le.transform(sample), err_msg=col)
+        np.testing.assert_array_equal(compiled[col].decode(expected), le.inverse_transform(expected), err_msg=col)
+    # With a fallback, unseen values get the UNKNOWN code and known ones keep
+    # theirs; columns without an UNKNOWN class still reject unseen values
+    fallback = EncoderSet(label_encoders, unknown=fallback_classes(label_encoders, 'UNKNOWN'))
+    for col, le in label_encoders.items():
+        values = pd.Series([le.classes_[0], '__never seen__'])
+        if col in fallback_columns(label_encoders, 'UNKNOWN'):
+            codes = fallback[col].encode_many(values)
+            assert list(codes) == [le.transform(le.classes_[:1])[0], le.transform(['UNKNOWN'])[0]], col
+        else:
+            try:
+                fallback[col].encode_many(values)
+            except ValueError:
+                continue
+            raise AssertionError(f'{col} has no UNKNOWN class but accepted an unseen value')
+
+
+def sklearn_encode_row(label_encoders, row, columns):
+    return [label_encoders[col].transform([row[col]])[0] for col in columns]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    for artifact in ARTIFACTS:
+        path = os.path.join(ROOT, artifact)
+        if not os.path.exists(path):
+            print(f'{artifact}: missing, skipped')
+            continue
+        label_encoders = joblib.load(path)
+        compiled = EncoderSet(label_encoders)
+        check_equivalence(label_encoders, compiled)
+
+        columns = list(label_encoders)
+        row = {col: label_encoders[col].classes_[0] for col in columns}
+        before = timeit.timeit(lambda: sklearn_encode_row(label_encoders, row, columns), number=args.repeat)
+        after = timeit.timeit(lambda: compiled.encode_row(row), number=args.repeat)
+        print(f'{artifact}: codes identical; per-row encode '
+              f'{before / args.repeat * 1e6:,.1f}us -> {after / args.repeat * 1e6:,.1f}us '
+              f'({before / after:.0f}x)')
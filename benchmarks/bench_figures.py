@@ -0,0 +1,62 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plotly.graph_objects as go
+
+from figures import figure_cache, plotly_chart
+
+# st.plotly_chart runs in bare mode here: the figure is still serialized into
+# the element proto, it just isn't sent anywhere
+
+
+def bar_figure(n_bars=300):
+    names = [f'STREET {i}' for i in range(n_bars)]
+    fig = go.Figure(go.Bar(x=names, y=np.arange(n_bars)[::-1], marker_color='#4cc9f0'))
+    fig.update_layout(title='Crashes by Street', plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+                      font=dict(color='white'))
+    return fig
+
+
+def scatter_figure(n_points=100_000, seed=0):
+    rng = np.random.default_rng(seed)
+    fig = go.Figure(go.Scattergl(x=rng.normal(-87.68, 0.06, n_points), y=rng.normal(41.85, 0.08, n_points),
+                                 mode='markers'))
+    fig.update_layout(title='Crash Locations')
+    return fig
+
+
+def time_renders(render, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        render(i)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time figure cache hits against misses.')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    failures = []
+    for name, build in [('bar', bar_figure), ('scatter', scatter_figure)]:
+        figure_cache.clear()
+        # A miss builds, caps and renders; every iteration uses a new filter key
+        miss = time_renders(lambda i: plotly_chart(name, ('miss', i), build), args.repeat)
+        plotly_chart(name, ('hit',), build)
+        hit = time_renders(lambda i: plotly_chart(name, ('hit',), build), args.repeat)
+        uncached = time_renders(lambda i: plotly_chart(name, (), build, cached=False), args.repeat)
+        status = 'ok' if hit < miss else 'FAIL'
+        if hit >= miss:
+            failures.append(name)
+        print(f'{name:<8} miss {miss * 1e3:7.2f} ms  hit {hit * 1e3:7.2f} ms  uncached {uncached * 1e3:7.2f} ms  '
+              f'({miss / hit:,.1f}x) {status}')
+    print(figure_cache.stats())
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,109 @@
+import argparse
+import gc
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from forest import CompactForest
+from model_registry import MODEL_ARTIFACTS, MODEL_DIR, _rss_bytes
+
+FORESTS = ['random_forest', 'riskModel']
+
+
+def sample_features(model, label_encoders, n_rows, seed=0):
+    # Random inputs in the model's feature order: a random class code for
+    # label-encoded columns, a small integer for numeric ones
+    rng = np.random.default_rng(seed)
+    names = getattr(model, 'feature_names_in_', range(model.n_features_in_))
+    columns = {}
+    for name in names:
+        if name in label_encoders:
+            columns[name] = rng.integers(0, len(label_encoders[name].classes_), n_rows)
+        else:
+            columns[name] = rng.integers(0, 100, n_rows)
+    return pd.DataFrame(columns)
+
+
+def synthetic_forest(n_rows=50_000, n_estimators=100, seed=0):
+    from sklearn.ensemble import RandomForestClassifier
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.integers(0, 20, (n_rows, 8)), columns=[f'f{i}' for i in range(8)])
+    y = (X['f0'] + X['f1'] * rng.random(n_rows) > 15).astype(int) + (X['f2'] > 17)
+    return RandomForestClassifier(n_estimators=n_estimators, random_state=seed).fit(X, y), {}
+
+
+def tree_bytes(model):
+    return sum(e.tree_.__getstate__()['nodes'].nbytes + e.tree_.value.nbytes for e in model.estimators_)
+
+
+def check_identical(model, compact, X):
+    np.testing.assert_array_equal(compact.predict_proba(X), model.predict_proba(X))
+    np.testing.assert_array_equal(compact.predict(X), model.predict(X))
+    for i in range(min(len(X), 200)):
+        np.testing.assert_array_equal(compact.predict_proba_one(X.iloc[i].to_numpy()), model.predict_proba(X.iloc[[i]])[0])
+
+
+def bench(name, model, label_encoders, rows, single_rows):
+    rss_loaded = _rss_bytes()
+    sklearn_bytes = tree_bytes(model)
+    start = time.perf_counter()
+    compact = CompactForest(model)
+    convert_seconds = time.perf_counter() - start
+
+    X = sample_features(model, label_encoders, rows)
+    check_identical(model, compact, X)
+
+    single = [X.iloc[[i]] for i in range(single_rows)]
+    start = time.perf_counter()
+    for row in single:
+        model.predict(row)
+    sklearn_single = (time.perf_counter() - start) / single_rows
+    start = time.perf_counter()
+    for row in single:
+        compact.predict_one(row.to_numpy())
+    compact_single = (time.perf_counter() - start) / single_rows
+
+    start = time.perf_counter()
+    model.predict(X)
+    sklearn_rate = rows / (time.perf_counter() - start)
+    start = time.perf_counter()
+    compact.predict(X)
+    compact_rate = rows / (time.perf_counter() - start)
+
+    del model
+    gc.collect()
+    rss_compact = _rss_bytes()
+
+    print(f'{name}: {compact.n_trees} trees, predictions bit-identical, converted in {convert_seconds:.2f}s')
+    print(f'  single row:   sklearn {sklearn_single * 1e3:8.2f}ms  compact {compact_single * 1e3:8.3f}ms '
+          f'({sklearn_single / compact_single:.0f}x)')
+    print(f'  batch:        sklearn {sklearn_rate:10,.0f} rows/sec  compact {compact_rate:10,.0f} rows/sec')
+    print(f'  tree arrays:  sklearn {sklearn_bytes / 2**20:8.1f}MB  compact {compact.nbytes / 2**20:8.1f}MB')
+    if rss_loaded is not None:
+        print(f'  RSS after dropping the sklearn model: {(rss_compact - rss_loaded) / 2**20:+.1f}MB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--single-rows', type=int, default=200)
+    args = parser.parse_args()
+
+    found = False
+    for name in FORESTS:
+        model_path = os.path.join(MODEL_DIR, MODEL_ARTIFACTS[name]['model'][0])
+        encoder_path = os.path.join(MODEL_DIR, MODEL_ARTIFACTS[name]['encoders'][0])
+        if not (os.path.exists(model_path) and os.path.exists(encoder_path)):
+            print(f'{name}: artifacts missing, skipped')
+            continue
+        found = True
+        bench(name, joblib.load(model_path), joblib.load(encoder_path), args.rows, args.single_rows)
+    if not found:
+        bench('synthetic', *synthetic_forest(), args.rows, args.single_rows)
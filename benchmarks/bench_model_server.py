@@ -0,0 +1,95 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import model_client
+from model_registry import RISK_FEATURES, registry
+from model_server import SERVED_MODELS, predict_records
+from batch_predict import INPUT_COLS
+
+
+def sample_records(name, n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    encoders = registry.get(name, 'encoders')
+    columns = RISK_FEATURES if name == 'riskModel' else INPUT_COLS
+    records = [{} for _ in range(n_rows)]
+    for col in columns:
+        if col in encoders.encoders:
+            classes = encoders[col].classes_
+            values = classes[rng.integers(0, len(classes), n_rows)].tolist()
+        else:
+            values = rng.integers(0, 100, n_rows).tolist()
+        for record, value in zip(records, values):
+            record[col] = value
+    return records
+
+
+def run_load(predict, records, clients, requests, rows):
+    # Every client sends `requests` requests of `rows` rows back to back
+    def client(i):
+        latencies = []
+        for j in range(requests):
+            start = (i * requests + j) * rows % (len(records) - rows)
+            t = time.perf_counter()
+            predict(records[start:start + rows])
+            latencies.append(time.perf_counter() - t)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        latencies = np.concatenate([np.array(l) for l in pool.map(client, range(clients))])
+    seconds = time.perf_counter() - start
+    return len(latencies) / seconds, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def start_server(socket_path, model, max_batch, max_wait_ms):
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'model_server.py'), '--socket', socket_path,
+                               '--models', model, '--max-batch', str(max_batch), '--max-wait-ms', str(max_wait_ms)],
+                              cwd=ROOT)
+    deadline = time.monotonic() + 120
+    while model_client.server_stats() is None:
+        if server.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("Model server did not start")
+        time.sleep(0.2)
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load generator for model_server.py')
+    parser.add_argument('--model', choices=SERVED_MODELS, default='random_forest')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=100, help='requests per client')
+    parser.add_argument('--rows', type=int, default=1, help='rows per request')
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    records = sample_records(args.model, 10_000)
+    print(f'{args.model}: {args.clients} clients x {args.requests} requests x {args.rows} rows')
+
+    rate, p50, p99 = run_load(lambda rows: predict_records(args.model, rows), records,
+                              args.clients, args.requests, args.rows)
+    print(f'in-process:   {rate:10,.0f} req/sec  p50 {p50 * 1e3:7.2f}ms  p99 {p99 * 1e3:7.2f}ms')
+
+    socket_path = os.path.join(tempfile.mkdtemp(), 'models.sock')
+    model_client.SOCKET_PATH = socket_path
+    server = start_server(socket_path, args.model, args.max_batch, args.max_wait_ms)
+    try:
+        rate, p50, p99 = run_load(lambda rows: model_client._request(
+            {'op': 'predict', 'model': args.model, 'rows': rows}, socket_path), records,
+            args.clients, args.requests, args.rows)
+        print(f'model server: {rate:10,.0f} req/sec  p50 {p50 * 1e3:7.2f}ms  p99 {p99 * 1e3:7.2f}ms')
+        for stats in model_client._request({'op': 'stats'}, socket_path)['stats']:
+            print(f"  {stats['batches']:,} batches, {stats['mean_batch_rows']:.1f} rows per batch")
+    finally:
+        server.terminate()
+        server.wait()
@@ -0,0 +1,37 @@
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.bench_model_server import sample_records
+from model_server import SERVED_MODELS, predict_records
+import model_client
+from prediction_cache import prediction_cache
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', choices=SERVED_MODELS, default='random_forest')
+    parser.add_argument('--scenarios', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    records = sample_records(args.model, args.scenarios)
+    start = time.perf_counter()
+    expected = [predict_records(args.model, [record])[0] for record in records]
+    uncached = (time.perf_counter() - start) / len(records)
+
+    prediction_cache.clear()
+    for record in records:
+        model_client.predict(args.model, [record])
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        cached = [model_client.predict(args.model, [record])[0] for record in records]
+    hit = (time.perf_counter() - start) / (len(records) * args.repeat)
+
+    assert cached == expected
+    print(f'{args.model}: encode+predict {uncached * 1e6:,.0f}us, cache hit {hit * 1e6:,.1f}us '
+          f'({uncached / hit:,.0f}x)')
+    print(prediction_cache.stats())
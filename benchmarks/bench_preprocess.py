@@ -0,0 +1,45 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_crash_frame
+from utilities import categorize_damage, extract_damage_value, preprocess_crash_data
+
+
+def legacy_preprocess(df):
+    # The row-by-row implementation preprocess_crash_data replaced
+    df['DAMAGE_VALUE'] = df['DAMAGE'].apply(extract_damage_value)
+    df['DAMAGE_CATEGORY'] = df['DAMAGE_VALUE'].apply(categorize_damage)
+    df['CRASH_DATE'] = pd.to_datetime(df['CRASH_DATE'], errors='coerce')
+    df['CRASH_MONTH'] = df['CRASH_DATE'].dt.month
+    df['CRASH_HOUR'] = pd.to_datetime(df['CRASH_DATE'], errors='coerce').dt.hour
+    return df
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    out = fn(df)
+    return out, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    base = make_crash_frame(args.rows)
+    legacy, legacy_s = timed(legacy_preprocess, base.copy())
+    vectorized, vectorized_s = timed(preprocess_crash_data, base.copy())
+
+    for col in ['DAMAGE_VALUE', 'DAMAGE_CATEGORY', 'CRASH_DATE', 'CRASH_MONTH', 'CRASH_HOUR']:
+        np.testing.assert_array_equal(legacy[col].to_numpy(), vectorized[col].to_numpy())
+
+    print(f'rows:       {args.rows:,}')
+    print(f'legacy:     {legacy_s:8.2f}s')
+    print(f'vectorized: {vectorized_s:8.2f}s  ({legacy_s / vectorized_s:.1f}x)')
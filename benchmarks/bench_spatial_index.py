@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import INJURIES, _choice
+from spatial import CHICAGO_BOUNDS, SpatialIndex, project
+
+
+def make_locations(n_rows, seed=0):
+    # Same spread around downtown as make_crash_frame, without the other columns
+    rng = np.random.default_rng(seed)
+    latitude = rng.normal(41.85, 0.08, n_rows)
+    longitude = rng.normal(-87.68, 0.06, n_rows)
+    no_location = rng.random(n_rows) < 0.007
+    latitude[no_location] = np.nan
+    longitude[no_location] = np.nan
+    injuries = _choice(rng, INJURIES, n_rows).astype('float32')
+    return latitude, longitude, injuries
+
+
+def brute_force_distances(latitude, longitude, lat, lon):
+    # Distance from every indexed crash; crashes the index leaves out are inf
+    south, west, north, east = CHICAGO_BOUNDS
+    x, y = project(latitude, longitude)
+    px, py = project(lat, lon)
+    distances = np.hypot(x - px, y - py)
+    inside = (latitude >= south) & (latitude < north) & (longitude >= west) & (longitude < east)
+    return np.where(inside, distances, np.inf)
+
+
+def latency(fn, points):
+    times = []
+    for lat, lon in points:
+        start = time.perf_counter()
+        fn(lat, lon)
+        times.append(time.perf_counter() - start)
+    return np.percentile(times, 50) * 1e3, np.percentile(times, 99) * 1e3
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 5_000_000])
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=100_000)
+    parser.add_argument('--radius', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    for n_rows in args.rows:
+        latitude, longitude, injuries = make_locations(n_rows)
+        start = time.perf_counter()
+        index = SpatialIndex(latitude, longitude, injuries)
+        build = time.perf_counter() - start
+        print(f'{n_rows:,} rows: index built in {build:.2f}s')
+
+        q_lat, q_lon, _ = make_locations(args.queries, seed=1)
+        points = [(a, b) for a, b in zip(q_lat, q_lon) if np.isfinite(a)]
+        # The index keeps float32 meters, so distances agree to well under a meter
+        for lat, lon in points[:5]:
+            expected = brute_force_distances(latitude, longitude, lat, lon)
+            found = index.within(lat, lon, args.radius)
+            assert abs(len(found) - (expected <= args.radius).sum()) <= 1
+            assert (expected[found] <= args.radius + 0.1).all()
+            rows, distances = index.nearest(lat, lon, args.k)
+            assert np.allclose(distances, np.sort(expected)[:args.k], atol=0.1)
+        # Points without a location find nothing rather than searching forever
+        assert len(index.within(np.nan, np.nan, args.radius)) == 0
+        assert index.injury_rate(np.nan, -87.68, args.radius)['crashes'] == 0
+        for lat, lon in [(np.nan, -87.68), (41.84, np.inf)]:
+            try:
+                index.nearest(lat, lon, args.k)
+            except ValueError:
+                continue
+            raise AssertionError(f'nearest({lat}, {lon}) did not raise ValueError')
+
+        for name, fn in [
+            (f'within {args.radius} m', lambda lat, lon: index.within(lat, lon, args.radius)),
+            (f'{args.k} nearest', lambda lat, lon: index.nearest(lat, lon, args.k)),
+            (f'injury rate {args.radius} m', lambda lat, lon: index.injury_rate(lat, lon, args.radius)),
+        ]:
+            p50, p99 = latency(fn, points)
+            print(f'  {name:<20} p50 {p50:7.3f} ms  p99 {p99:7.3f} ms')
+
+        b_lat, b_lon, _ = make_locations(args.batch, seed=2)
+        start = time.perf_counter()
+        features = index.density_features(b_lat, b_lon)
+        seconds = time.perf_counter() - start
+        print(f'  density features for {args.batch:,} points in {seconds:.2f}s '
+              f'({args.batch / seconds:,.0f} points/s, {features.shape[1]} columns)')
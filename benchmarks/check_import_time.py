@@ -0,0 +1,64 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from startup_profile import PAGES, import_profile, page_profile
+
+MODEL_LIBRARIES = ['joblib', 'sklearn', 'lightgbm', 'xgboost']
+# Libraries each module must not pull in at import time, and the most its
+# import may take on a cold process (after streamlit is loaded). pyarrow is
+# only forbidden where pandas isn't imported: pandas loads it when installed.
+# Budgets are about 2.5x the cold imports measured when they were set, so
+# they catch a new heavy import rather than machine noise.
+IMPORT_RULES = {
+    'perf': (['numpy', 'pandas', 'plotly', 'pyarrow'] + MODEL_LIBRARIES, 0.1),
+    'preload': (['numpy', 'pandas', 'plotly', 'pyarrow'] + MODEL_LIBRARIES, 0.1),
+    'figures': (['plotly', 'pyarrow'] + MODEL_LIBRARIES, 0.6),
+    'crash_store': (['plotly'] + MODEL_LIBRARIES, 1.5),
+    'encoders': (['plotly'] + MODEL_LIBRARIES, 1.5),
+    'model_registry': (['plotly'] + MODEL_LIBRARIES, 1.5),
+    'model_client': (['plotly'] + MODEL_LIBRARIES, 2.0),
+    'utilities': (['plotly', 'pydeck'] + MODEL_LIBRARIES, 2.5),
+}
+FIRST_PAINT_SECONDS = 1.0
+
+
+def check(scale=1.0, pages=PAGES, first_paint=FIRST_PAINT_SECONDS):
+    failures = []
+    for module, (forbidden, budget) in IMPORT_RULES.items():
+        profile = import_profile(module)
+        loaded = [name for name in profile['heavy'] if name in forbidden]
+        status = 'ok'
+        if loaded:
+            failures.append(f"import {module} loads {', '.join(loaded)}")
+            status = 'FAIL'
+        if profile['seconds'] > budget * scale:
+            failures.append(f"import {module} took {profile['seconds']:.3f}s, budget {budget * scale:.3f}s")
+            status = 'FAIL'
+        print(f"import {module:<16} {profile['seconds'] * 1e3:8.1f} ms (budget {budget * scale * 1e3:.0f} ms) {status}")
+    for page in pages:
+        profile = page_profile(page)
+        seconds = profile['first_paint']
+        status = 'ok'
+        if seconds is None or seconds > first_paint * scale:
+            failures.append(f"{page} first paint {'never happened' if seconds is None else f'took {seconds:.3f}s'}, "
+                            f"budget {first_paint * scale:.3f}s")
+            status = 'FAIL'
+        shown = f'{seconds * 1e3:8.1f} ms' if seconds is not None else '       -   '
+        print(f"page {page:<18} first paint {shown} (budget {first_paint * scale * 1e3:.0f} ms) {status}")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fail when a module or page gets slower to import or paint.')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply every budget, e.g. 2 on a slow CI box')
+    parser.add_argument('--pages', nargs='*', default=PAGES)
+    parser.add_argument('--first-paint', type=float, default=FIRST_PAINT_SECONDS)
+    args = parser.parse_args()
+
+    failures = check(args.scale, args.pages, args.first_paint)
+    for failure in failures:
+        print(f'FAIL {failure}')
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,80 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import crash_store
+from benchmarks.synthetic import make_crash_frame
+from ingest_delta import ID_COL, ingest_delta
+
+
+def make_delta(stored, n_new, seed):
+    # Re-sent records, one of them corrected into another crash month, plus
+    # records the store has never seen
+    resent = stored.sample(3, random_state=seed).copy()
+    moved = pd.to_datetime(resent['CRASH_DATE'].iloc[0], format=crash_store.CRASH_DATE_FORMAT)
+    moved += pd.DateOffset(months=7)
+    resent.iloc[0, resent.columns.get_loc('CRASH_DATE')] = moved.strftime(crash_store.CRASH_DATE_FORMAT)
+    return pd.concat([resent, make_crash_frame(n_new, seed=seed + 1)], ignore_index=True)
+
+
+def check(n_rows, n_new, seed=0):
+    failures = []
+    stored = make_crash_frame(n_rows, seed=seed)
+    chunks = [stored.iloc[i::len(crash_store.CSV_FILES)] for i in range(len(crash_store.CSV_FILES))]
+    for path, chunk in zip(crash_store.CSV_FILES, chunks):
+        chunk.to_csv(path, index=False)
+    crash_store.ingest_csvs()
+
+    make_delta(stored, n_new, seed).to_csv('delta.csv', index=False)
+    manifest = ingest_delta('delta.csv')
+    if manifest['rows'] != n_rows + n_new:
+        failures.append(f"store holds {manifest['rows']:,} rows after the delta, expected {n_rows + n_new:,}")
+    ids = crash_store.read_store(columns=[ID_COL])[ID_COL]
+    if ids.duplicated().any():
+        failures.append(f"{ids.duplicated().sum():,} record IDs are stored more than once")
+
+    # The same export sent again adds nothing
+    manifest = ingest_delta('delta.csv')
+    if manifest['rows'] != n_rows + n_new or manifest['generation'] != 1:
+        failures.append("re-ingesting the same delta added rows or a generation")
+
+    # Every generation has its ID index, and it finds every delta record
+    index_dir = os.path.join(crash_store.STORE_DIR, crash_store.ID_INDEX_DIR)
+    if sorted(os.listdir(index_dir)) != ['gen-000000.npy', 'gen-000001.npy']:
+        failures.append(f"ID index holds {sorted(os.listdir(index_dir))}, expected generations 0 and 1")
+    delta_ids = pd.read_csv('delta.csv', usecols=[ID_COL])[ID_COL]
+    if len(crash_store.stored_record_ids(delta_ids)) != delta_ids.nunique():
+        failures.append("the ID index misses records that are stored")
+    # A store built before the index falls back to scanning the partitions
+    shutil.rmtree(index_dir)
+    manifest = ingest_delta('delta.csv')
+    if manifest['rows'] != n_rows + n_new or manifest['generation'] != 1:
+        failures.append("re-ingesting without the ID index added rows or a generation")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that re-sent records are never stored twice.')
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--new', type=int, default=50)
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp(prefix='crash-ingest-')
+    os.chdir(workspace)
+    try:
+        failures = check(args.rows, args.new)
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(workspace, ignore_errors=True)
+    for failure in failures:
+        print(f'FAIL {failure}')
+    if not failures:
+        print('ok: re-sent and corrected records were not duplicated')
+    sys.exit(1 if failures else 0)
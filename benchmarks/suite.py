@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Everything runs in a scratch workspace: synthetic CSVs, the Parquet store
+# and, unless CRASH_MODEL_DIR is already set, synthetic stand-in models. The
+# model server socket points into it too so predictions stay in-process.
+WORK_DIR = tempfile.mkdtemp(prefix='crash-bench-')
+SYNTHETIC_MODEL_DIR = os.path.join(WORK_DIR, 'models')
+os.environ.setdefault('CRASH_MODEL_DIR', SYNTHETIC_MODEL_DIR)
+os.environ['CRASH_MODEL_SOCKET'] = os.path.join(WORK_DIR, 'no-server.sock')
+
+import numpy as np
+import pandas as pd
+
+import crash_store
+import dataset_snapshot
+from benchmarks.bench_encoders import check_equivalence
+from benchmarks.bench_model_server import sample_records
+from benchmarks.synthetic import make_crash_frame
+from benchmarks.synthetic_models import build_synthetic_models
+from model_registry import registry
+from model_server import SERVED_MODELS, predict_records
+from rollups import build_rollup_cube, road_summary, slice_rollup
+from spatial import CHICAGO_CENTER, SpatialGrid, SpatialIndex
+from utilities import (DEFAULT_FILTERS, RAW_SCHEMA, CrashFilterEngine, SharedDataset, apply_schema,
+                       concat_crash_parts, filter_data, get_dataset_loader, load_crash_data_with_progress,
+                       preprocess_crash_data)
+
+SIZES = {'100k': 100_000, '1M': 1_000_000, '10M': 10_000_000}
+PAGES = ['Home.py', 'pages/Roads.py', 'pages/Map.py', 'pages/Model.py', 'pages/Risk.py']
+# Pages whose main action sits behind a button
+PAGE_BUTTONS = {'pages/Model.py': 'Predict Crash Type', 'pages/Risk.py': '🔍 Predict Risk Level'}
+BATCH_ROWS = 1000
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def measure(fn, repeat):
+    # Best of `repeat` runs; the minimum is the least noisy estimate
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def write_csvs(n_rows, workspace):
+    # The export split over the same 13 files the app reads
+    df = make_crash_frame(n_rows)
+    for i, chunk in enumerate(np.array_split(np.arange(n_rows), len(crash_store.CSV_FILES))):
+        df.iloc[chunk].to_csv(os.path.join(workspace, crash_store.CSV_FILES[i]), index=False)
+
+
+def bench_utilities(n_rows, repeat):
+    workspace = os.path.join(WORK_DIR, f'data-{n_rows}')
+    os.makedirs(workspace, exist_ok=True)
+    os.chdir(workspace)
+    write_csvs(n_rows, workspace)
+    results = {}
+    results['load_csv'] = measure(load_crash_data_with_progress, repeat)
+    results['ingest_store'] = measure(crash_store.ingest_csvs, 1)
+    results['load_store'] = measure(load_crash_data_with_progress, repeat)
+
+    raw = load_crash_data_with_progress()
+    # Parts categorized on their own, as the loader reads them, concat back
+    # into categorical columns
+    parts = [raw.iloc[i::len(crash_store.CSV_FILES)].copy() for i in range(len(crash_store.CSV_FILES))]
+    for part in parts:
+        apply_schema(part, RAW_SCHEMA)
+    results['concat_parts'] = measure(lambda: concat_crash_parts(parts), repeat)
+    combined = concat_crash_parts(parts)
+    assert all(str(combined[col].dtype) == 'category' for col, dtype in RAW_SCHEMA.items()
+               if dtype == 'category' and col in combined.columns)
+    results['preprocess'] = measure(lambda: preprocess_crash_data(raw.copy(), report=False), repeat)
+    df = preprocess_crash_data(raw, report=False)
+    df.sort_values('CRASH_DATE', kind='stable', ignore_index=True, inplace=True)
+    start, end, _, _ = DEFAULT_FILTERS
+    results['filter_data'] = measure(lambda: filter_data(df, start, end, 'CLEAR', 'Minor'), repeat)
+    results['filter_engine_build'] = measure(lambda: CrashFilterEngine(df), repeat)
+    engine = CrashFilterEngine(df)
+    # Without a selection cache every call searches and takes the rows again
+    uncached = CrashFilterEngine(df, cache_size=0)
+    results['filter_engine_filter'] = measure(lambda: uncached.filter(start, end, 'CLEAR', 'Minor'), repeat)
+    results['filter_engine_cached'] = measure(lambda: engine.filter(start, end, 'CLEAR', 'Minor'), repeat)
+    results['rollup_cube'] = measure(lambda: build_rollup_cube(df), repeat)
+    cube = build_rollup_cube(df)
+    results['slice_rollup'] = measure(lambda: slice_rollup(cube['base'], start, end, 'CLEAR', 'Minor'), repeat)
+    results['road_summary'] = measure(lambda: road_summary(cube['roads']), repeat)
+    results['spatial_grid_build'] = measure(
+        lambda: SpatialGrid(df['LATITUDE'], df['LONGITUDE'], df['INJURIES_TOTAL']), repeat)
+    grid = SpatialGrid(df['LATITUDE'], df['LONGITUDE'], df['INJURIES_TOTAL'])
+    rows = engine.rows(start, end, 'All', 'All')
+    results['spatial_grid_aggregate'] = measure(lambda: grid.aggregate(rows, 12), repeat)
+    results['spatial_index_build'] = measure(
+        lambda: SpatialIndex(df['LATITUDE'], df['LONGITUDE'], df['INJURIES_TOTAL']), repeat)
+    index = SpatialIndex(df['LATITUDE'], df['LONGITUDE'], df['INJURIES_TOTAL'])
+    results['spatial_index_injury_rate'] = measure(lambda: index.injury_rate(*CHICAGO_CENTER, 500), repeat)
+    results['spatial_index_nearest'] = measure(lambda: index.nearest(*CHICAGO_CENTER, 10), repeat)
+
+    # A replica mapping a published snapshot gets the filter and spatial
+    # structures without rebuilding them
+    snapshot_dir = os.path.join(workspace, 'snapshots')
+    dataset_snapshot.publish_snapshot(df, cube, 1, snapshot_dir, derived=SharedDataset(df, cube).derived_arrays())
+
+    def map_dataset():
+        mapped = SharedDataset(*dataset_snapshot.open_snapshot(1, snapshot_dir))
+        return mapped, mapped.spatial_grid, mapped.spatial_index
+    results['snapshot_map'] = measure(map_dataset, repeat)
+    mapped, mapped_grid, mapped_index = map_dataset()
+    assert np.array_equal(mapped.filter_engine.rows(start, end, 'CLEAR', 'Minor'),
+                          engine.rows(start, end, 'CLEAR', 'Minor'))
+    assert mapped_grid.aggregate(rows, 12).equals(grid.aggregate(rows, 12))
+    assert np.array_equal(mapped_index.nearest(*CHICAGO_CENTER, 10)[0], index.nearest(*CHICAGO_CENTER, 10)[0])
+    os.chdir(ROOT)
+    return results
+
+
+def bench_pages(n_rows, repeat):
+    # Headless reruns against the shared dataset, which is loaded once per
+    # process; cold is the first run of each page, warm the best rerun
+    from streamlit.testing.v1 import AppTest
+
+    workspace = os.path.join(WORK_DIR, f'pages-{n_rows}')
+    os.makedirs(workspace, exist_ok=True)
+    os.chdir(workspace)
+    write_csvs(n_rows, workspace)
+    crash_store.ingest_csvs()
+    start = time.perf_counter()
+    get_dataset_loader().wait()
+    results = {'dataset_load': time.perf_counter() - start}
+
+    for page in PAGES:
+        name = os.path.splitext(os.path.basename(page))[0]
+        at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=600)
+
+        def run(at=at, page=page):
+            at.run()
+            if page in PAGE_BUTTONS:
+                next(b for b in at.button if b.label == PAGE_BUTTONS[page]).click().run()
+            if at.exception:
+                raise RuntimeError(f'{page}: {at.exception[0].message}')
+
+        try:
+            results[f'{name}.cold'] = measure(run, 1)
+            results[f'{name}.warm'] = measure(run, repeat)
+        except Exception as e:
+            print(f'{page} failed: {e}')
+    os.chdir(ROOT)
+    return results
+
+
+def bench_models(repeat):
+    results = {}
+    for name in SERVED_MODELS:
+        if not registry.is_available(name):
+            continue
+        records = sample_records(name, BATCH_ROWS)
+        registry.load(name)
+        # Every run also checks the compiled encoders against LabelEncoder
+        encoders = registry.get(name, 'encoders')
+        check_equivalence(encoders.label_encoders, encoders)
+        single = measure(lambda: predict_records(name, records[:1]), repeat)
+        batch = measure(lambda: predict_records(name, records), repeat)
+        results[f'{name}.single_row'] = single
+        results[f'{name}.batch_per_row'] = batch / len(records)
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Timings more than `threshold` (a fraction) slower than the baseline
+    regressions = []
+    for key, seconds in results['timings'].items():
+        before = baseline['timings'].get(key)
+        if before and seconds > before * (1 + threshold):
+            regressions.append((key, before, seconds))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='+', choices=SIZES, default=['100k', '1M'])
+    parser.add_argument('--page-size', choices=SIZES, default='100k')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip', nargs='*', choices=['utilities', 'pages', 'models'], default=[])
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fraction slower than the baseline that counts as a regression')
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+
+    try:
+        if os.environ['CRASH_MODEL_DIR'] == SYNTHETIC_MODEL_DIR:
+            print('Trained synthetic models:', ', '.join(build_synthetic_models(SYNTHETIC_MODEL_DIR)))
+
+        timings = {}
+        if 'utilities' not in args.skip:
+            for size in args.sizes:
+                # The larger frames are timed once per function
+                repeat = args.repeat if SIZES[size] < 1_000_000 else 1
+                for key, seconds in bench_utilities(SIZES[size], repeat).items():
+                    timings[f'utilities.{size}.{key}'] = seconds
+        if 'models' not in args.skip:
+            for key, seconds in bench_models(args.repeat).items():
+                timings[f'models.{key}'] = seconds
+        if 'pages' not in args.skip:
+            for key, seconds in bench_pages(SIZES[args.page_size], args.repeat).items():
+                timings[f'pages.{args.page_size}.{key}'] = seconds
+    finally:
+        os.chdir(ROOT)
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+        'synthetic_models': os.environ['CRASH_MODEL_DIR'] == SYNTHETIC_MODEL_DIR,
+        'timings': timings,
+    }
+    for key, seconds in timings.items():
+        print(f'{key:<50} {seconds * 1e3:>12,.2f} ms')
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{time.strftime("%Y%m%d-%H%M%S")}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f'Results written to {output}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f'Baseline saved to {args.baseline}')
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for key, before, after in regressions:
+            print(f'REGRESSION {key}: {before * 1e3:,.2f} ms -> {after * 1e3:,.2f} ms '
+                  f'(+{(after / before - 1) * 100:.0f}%)')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions over {args.threshold:.0%} against {args.baseline}')
+    else:
+        print(f'No baseline at {args.baseline}; rerun with --save-baseline to record one')
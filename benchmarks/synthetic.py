@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+# Value pools mirror the Chicago "Traffic Crashes - Crashes" export, roughly
+# in the proportions they appear there.
+DAMAGE = (['OVER $1,500', '$501 - $1,500', '$500 OR LESS'], [0.62, 0.26, 0.12])
+WEATHER = (['CLEAR', 'RAIN', 'SNOW', 'CLOUDY/OVERCAST', 'UNKNOWN', 'FOG/SMOKE/HAZE', 'OTHER'],
+           [0.78, 0.09, 0.04, 0.03, 0.05, 0.005, 0.005])
+LIGHTING = (['DAYLIGHT', 'DARKNESS, LIGHTED ROAD', 'DARKNESS', 'DUSK', 'DAWN', 'UNKNOWN'],
+            [0.64, 0.22, 0.05, 0.03, 0.02, 0.04])
+TRAFFICWAY = (['NOT DIVIDED', 'DIVIDED - W/MEDIAN (NOT RAISED)', 'ONE-WAY', 'FOUR WAY', 'PARKING LOT',
+               'DIVIDED - W/MEDIAN BARRIER', 'OTHER', 'T-INTERSECTION', 'ALLEY'],
+              [0.33, 0.16, 0.13, 0.10, 0.07, 0.06, 0.05, 0.05, 0.05])
+SURFACE = (['DRY', 'WET', 'UNKNOWN', 'SNOW OR SLUSH', 'ICE', 'OTHER'], [0.72, 0.13, 0.09, 0.04, 0.01, 0.01])
+DEFECT = (['NO DEFECTS', 'UNKNOWN', 'RUT, HOLES', 'OTHER', 'WORN SURFACE', 'SHOULDER DEFECT'],
+          [0.80, 0.17, 0.01, 0.01, 0.005, 0.005])
+CAUSE = (['UNABLE TO DETERMINE', 'FAILING TO YIELD RIGHT-OF-WAY', 'FOLLOWING TOO CLOSELY',
+          'NOT APPLICABLE', 'IMPROPER OVERTAKING/PASSING', 'FAILING TO REDUCE SPEED TO AVOID CRASH',
+          'IMPROPER BACKING', 'IMPROPER LANE USAGE', 'IMPROPER TURNING/NO SIGNAL',
+          'DISTRACTION - FROM INSIDE VEHICLE'],
+         [0.39, 0.11, 0.10, 0.06, 0.05, 0.05, 0.05, 0.05, 0.07, 0.07])
+CRASH_TYPE = (['REAR END', 'PARKED MOTOR VEHICLE', 'SIDESWIPE SAME DIRECTION', 'TURNING', 'ANGLE',
+               'FIXED OBJECT', 'PEDESTRIAN', 'PEDALCYCLIST', 'SIDESWIPE OPPOSITE DIRECTION', 'HEAD ON'],
+              [0.23, 0.23, 0.15, 0.14, 0.11, 0.05, 0.03, 0.02, 0.02, 0.02])
+SPEED_LIMITS = ([30, 25, 35, 20, 15, 40, 10, 45, 5, 55], [0.73, 0.07, 0.07, 0.04, 0.03, 0.02, 0.02, 0.01, 0.005, 0.005])
+ALIGNMENT = (['STRAIGHT AND LEVEL', 'STRAIGHT ON GRADE', 'CURVE, LEVEL', 'STRAIGHT ON HILLCREST', 'CURVE ON GRADE'],
+             [0.97, 0.015, 0.008, 0.004, 0.003])
+MANEUVER = (['STRAIGHT AHEAD', 'PARKED', 'SLOW/STOP IN TRAFFIC', 'TURNING LEFT', 'BACKING', 'TURNING RIGHT',
+             'CHANGING LANES', 'UNKNOWN'],
+            [0.45, 0.12, 0.10, 0.08, 0.06, 0.05, 0.04, 0.10])
+SEX = (['M', 'F', 'X', 'UNKNOWN'], [0.55, 0.35, 0.06, 0.04])
+INJURIES = ([0, 1, 2, 3, 4, 5, 6], [0.86, 0.09, 0.03, 0.01, 0.005, 0.003, 0.002])
+
+
+def _choice(rng, pool, n):
+    values, weights = pool
+    weights = np.asarray(weights, dtype=float)
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=n, p=weights / weights.sum())]
+
+
+def make_crash_frame(n_rows, seed=0, start='2016-01-01', end='2025-02-15'):
+    rng = np.random.default_rng(seed)
+    start_ts = pd.Timestamp(start).value // 10**9
+    end_ts = pd.Timestamp(end).value // 10**9
+    dates = pd.to_datetime(rng.integers(start_ts, end_ts, size=n_rows), unit='s').floor('min')
+
+    injuries = _choice(rng, INJURIES, n_rows).astype(float)
+    injuries[rng.random(n_rows) < 0.002] = np.nan
+    damage = _choice(rng, DAMAGE, n_rows)
+    damage[rng.random(n_rows) < 0.001] = np.nan
+    latitude = rng.normal(41.85, 0.08, n_rows)
+    longitude = rng.normal(-87.68, 0.06, n_rows)
+    no_location = rng.random(n_rows) < 0.007
+    latitude[no_location] = np.nan
+    longitude[no_location] = np.nan
+
+    return pd.DataFrame({
+        'CRASH_RECORD_ID': [f'{seed:04x}{i:060x}' for i in range(n_rows)],
+        'CRASH_DATE': dates.strftime('%m/%d/%Y %I:%M:%S %p'),
+        'POSTED_SPEED_LIMIT': _choice(rng, SPEED_LIMITS, n_rows).astype(np.int64),
+        'WEATHER_CONDITION': _choice(rng, WEATHER, n_rows),
+        'LIGHTING_CONDITION': _choice(rng, LIGHTING, n_rows),
+        'FIRST_CRASH_TYPE': _choice(rng, CRASH_TYPE, n_rows),
+        'TRAFFICWAY_TYPE': _choice(rng, TRAFFICWAY, n_rows),
+        'ROADWAY_SURFACE_COND': _choice(rng, SURFACE, n_rows),
+        'ROAD_DEFECT': _choice(rng, DEFECT, n_rows),
+        'DAMAGE': damage,
+        'PRIM_CONTRIBUTORY_CAUSE': _choice(rng, CAUSE, n_rows),
+        'SEC_CONTRIBUTORY_CAUSE': _choice(rng, CAUSE, n_rows),
+        'NUM_UNITS': rng.choice([1, 2, 3, 4], size=n_rows, p=[0.05, 0.85, 0.08, 0.02]),
+        'INJURIES_TOTAL': injuries,
+        'INJURIES_FATAL': np.where(injuries > 3, rng.random(n_rows) < 0.05, 0).astype(float),
+        'CRASH_DAY_OF_WEEK': dates.dayofweek.to_numpy() % 7 + 1,
+        'LATITUDE': latitude,
+        'LONGITUDE': longitude,
+    })
+
+
+def make_model_inputs(n_rows, seed=0):
+    # Inputs of the crash-type models, as strings the way their encoders were
+    # fit, plus the FIRST_CRASH_TYPE target
+    rng = np.random.default_rng(seed)
+    dates = pd.to_datetime(rng.integers(1_450_000_000, 1_740_000_000, size=n_rows), unit='s')
+    return pd.DataFrame({
+        'POSTED_SPEED_LIMIT': _choice(rng, SPEED_LIMITS, n_rows),
+        'WEATHER_CONDITION': _choice(rng, WEATHER, n_rows),
+        'LIGHTING_CONDITION': _choice(rng, LIGHTING, n_rows),
+        'TRAFFICWAY_TYPE': _choice(rng, TRAFFICWAY, n_rows),
+        'ALIGNMENT': _choice(rng, ALIGNMENT, n_rows),
+        'ROADWAY_SURFACE_COND': _choice(rng, SURFACE, n_rows),
+        'ROAD_DEFECT': _choice(rng, DEFECT, n_rows),
+        'PRIM_CONTRIBUTORY_CAUSE': _choice(rng, CAUSE, n_rows),
+        'SEC_CONTRIBUTORY_CAUSE': _choice(rng, CAUSE, n_rows),
+        'CRASH_HOUR': dates.hour.astype(float),
+        'CRASH_DAY_OF_WEEK': (dates.dayofweek % 7 + 1).astype(float),
+        'CRASH_MONTH': dates.month.astype(float),
+        'MANEUVER': _choice(rng, MANEUVER, n_rows),
+        'SEX': _choice(rng, SEX, n_rows),
+        'AGE': rng.integers(16, 90, n_rows).astype(float),
+        'FIRST_CRASH_TYPE': _choice(rng, CRASH_TYPE, n_rows),
+    }).astype(str)
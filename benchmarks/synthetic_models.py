@@ -0,0 +1,54 @@
+import os
+
+import joblib
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.naive_bayes import CategoricalNB
+from sklearn.preprocessing import LabelEncoder
+
+from batch_predict import INPUT_COLS, TARGET_COL
+from benchmarks.synthetic import make_crash_frame, make_model_inputs
+from crash_store import CRASH_DATE_FORMAT
+from model_registry import MODEL_ARTIFACTS
+from train_risk_model import CATEGORICAL, LABEL, encode, prepare_chunk
+
+
+def _dump(value, model_dir, name, artifact):
+    path = os.path.join(model_dir, MODEL_ARTIFACTS[name][artifact][0])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    joblib.dump(value, path)
+
+
+def build_synthetic_models(model_dir, n_rows=20_000, seed=0):
+    # Small stand-ins for the artifacts in models/ (Git LFS) and the
+    # Drive-hosted risk model, saved where the registry expects them, so the
+    # benchmarks run offline. They have the real feature sets and encoders.
+    inputs = make_model_inputs(n_rows, seed)
+    label_encoders = {col: LabelEncoder().fit(inputs[col]) for col in INPUT_COLS + [TARGET_COL]}
+    X = pd.DataFrame({col: label_encoders[col].transform(inputs[col]) for col in INPUT_COLS})
+    y = label_encoders[TARGET_COL].transform(inputs[TARGET_COL])
+
+    models = {
+        'random_forest': RandomForestClassifier(n_estimators=100, max_depth=16, random_state=seed),
+        'categoricalNB': CategoricalNB(min_categories=[len(label_encoders[col].classes_) for col in INPUT_COLS]),
+    }
+    try:
+        from lightgbm import LGBMClassifier
+        models['lightGBM'] = LGBMClassifier(n_estimators=100, random_state=seed, verbose=-1)
+    except ImportError:
+        pass
+    for name, model in models.items():
+        _dump(model.fit(X, y), model_dir, name, 'model')
+        _dump(label_encoders, model_dir, name, 'encoders')
+
+    crashes = make_crash_frame(n_rows, seed)
+    crashes['CRASH_HOUR'] = pd.to_datetime(crashes['CRASH_DATE'], format=CRASH_DATE_FORMAT).dt.hour
+    prepared = prepare_chunk(crashes)
+    prepared = {col: prepared[col].array if col in CATEGORICAL + [LABEL] else prepared[col].to_numpy()
+                for col in prepared.columns}
+    X, y, encoders, target_encoder = encode(prepared)
+    _dump(RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=seed).fit(X, y),
+          model_dir, 'riskModel', 'model')
+    _dump(encoders, model_dir, 'riskModel', 'encoders')
+    _dump(target_encoder, model_dir, 'riskModel', 'target_encoder')
+    return list(models) + ['riskModel']
@@ -0,0 +1,372 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from itertools import groupby
+
+import numpy as np
+import pandas as pd
+
+CSV_FILES = [f'crash_data_{i+1}.csv' for i in range(13)]
+STORE_DIR = 'crash_store'
+# Bumped whenever the on-disk layout changes; older stores count as stale
+STORE_VERSION = 2
+MANIFEST = '_manifest.json'
+ROLLUP_DIR = '_rollups'
+ROLLUP_GENERATION = '_generation.json'
+ID_INDEX_DIR = '_ids'
+ID_COL = 'CRASH_RECORD_ID'
+CRASH_DATE_FORMAT = '%m/%d/%Y %I:%M:%S %p'
+
+# Every column the dashboard reads, with its in-memory dtype. Integer columns
+# fall back to float32 when they contain missing values.
+CRASH_SCHEMA = {
+    'CRASH_RECORD_ID': 'object',
+    'CRASH_DATE': 'datetime64[ns]',
+    'POSTED_SPEED_LIMIT': 'int16',
+    'WEATHER_CONDITION': 'category',
+    'LIGHTING_CONDITION': 'category',
+    'FIRST_CRASH_TYPE': 'category',
+    'TRAFFICWAY_TYPE': 'category',
+    'ROADWAY_SURFACE_COND': 'category',
+    'ROAD_DEFECT': 'category',
+    'DAMAGE': 'category',
+    'PRIM_CONTRIBUTORY_CAUSE': 'category',
+    'SEC_CONTRIBUTORY_CAUSE': 'category',
+    'NUM_UNITS': 'int8',
+    'INJURIES_TOTAL': 'float32',
+    'INJURIES_FATAL': 'float32',
+    'CRASH_DAY_OF_WEEK': 'int8',
+    'LATITUDE': 'float32',
+    'LONGITUDE': 'float32',
+}
+
+
+def parse_crash_date(values):
+    parsed = pd.to_datetime(values, format=CRASH_DATE_FORMAT, errors='coerce')
+    # Fall back to inference only for the rows that don't match the export format
+    missing = parsed.isna() & values.notna()
+    if missing.any():
+        parsed[missing] = pd.to_datetime(values[missing], errors='coerce')
+    return parsed
+
+
+def read_manifest(store_dir=STORE_DIR):
+    path = os.path.join(store_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, store_dir=STORE_DIR):
+    # Readers never see a half-written manifest
+    path = os.path.join(store_dir, MANIFEST)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def store_generation(store_dir=STORE_DIR):
+    manifest = read_manifest(store_dir)
+    return manifest.get('generation', 0) if manifest is not None else None
+
+
+def store_is_fresh(store_dir=STORE_DIR, csv_files=CSV_FILES):
+    # Stale when it was built with an older layout, or when a source CSV was
+    # added, removed or modified since the build. A store whose CSVs are all
+    # gone is the only copy of the data and stays in use.
+    manifest = read_manifest(store_dir)
+    if manifest is None or manifest.get('version') != STORE_VERSION:
+        return False
+    built_from = {source['path']: source['mtime'] for source in manifest['sources']}
+    present = [path for path in csv_files if os.path.exists(path)]
+    if not present:
+        return True
+    if set(present) != set(built_from):
+        return False
+    return all(os.path.getmtime(path) <= built_from[path] for path in present)
+
+
+def store_schema():
+    # The Arrow schema every store file is written with: categories are kept
+    # as strings (Parquet dictionary-encodes them anyway) and integers are
+    # nullable, so files written from different CSVs or deltas always match
+    import pyarrow as pa
+    types = {
+        'object': pa.string(),
+        'category': pa.string(),
+        'datetime64[ns]': pa.timestamp('ns'),
+        'int8': pa.int8(),
+        'int16': pa.int16(),
+        'float32': pa.float32(),
+    }
+    return pa.schema([(col, types[dtype]) for col, dtype in CRASH_SCHEMA.items()])
+
+
+def to_store_table(df):
+    import pyarrow as pa
+    schema = store_schema()
+    arrays = []
+    for field in schema:
+        if field.name not in df.columns:
+            arrays.append(pa.nulls(len(df), field.type))
+            continue
+        col = df[field.name]
+        if pa.types.is_string(field.type):
+            arrays.append(pa.array(col.astype('string'), from_pandas=True).cast(field.type))
+        elif pa.types.is_timestamp(field.type):
+            arrays.append(pa.array(pd.to_datetime(col, errors='coerce'), type=field.type, from_pandas=True))
+        else:
+            arrays.append(pa.array(pd.to_numeric(col, errors='coerce'), type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _partition_dir(store_dir, year, month):
+    return os.path.join(store_dir, f'crash_year={year}', f'crash_month={month}')
+
+
+def partition_keys(df):
+    dates = df['CRASH_DATE']
+    return [dates.dt.year.fillna(0).astype('int16'), dates.dt.month.fillna(0).astype('int8')]
+
+
+def _write_partitions(df, store_dir, part_name):
+    # Returns the written files, relative to store_dir
+    import pyarrow.parquet as pq
+    files = []
+    for (year, month), part in df.groupby(partition_keys(df), sort=False):
+        out_dir = _partition_dir(store_dir, year, month)
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f'{part_name}.parquet')
+        pq.write_table(to_store_table(part), path)
+        files.append(os.path.relpath(path, store_dir))
+    return files
+
+
+def compact_partition(path, part_name):
+    # Rewrites every file of a partition as one
+    import pyarrow.parquet as pq
+    files = _parquet_files(path)
+    table = _scan(files)
+    pq.write_table(table, os.path.join(path, f'{part_name}.parquet.tmp'))
+    for file_path in files:
+        os.remove(file_path)
+    os.replace(os.path.join(path, f'{part_name}.parquet.tmp'), os.path.join(path, f'{part_name}.parquet'))
+
+
+def ingest_csvs(csv_files=CSV_FILES, store_dir=STORE_DIR):
+    # Build into a scratch directory and swap it in, so a crashed ingest never
+    # leaves a half-written store that looks fresh. Each CSV is written out on
+    # its own, then every partition is compacted into a single file so a
+    # load reads one file per month rather than one per month and CSV.
+    tmp_dir = store_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    sources = []
+    digests = []
+    start = time.perf_counter()
+    for i, path in enumerate(csv_files):
+        df = pd.read_csv(path, usecols=lambda c: c in CRASH_SCHEMA, low_memory=False)
+        df['CRASH_DATE'] = parse_crash_date(df['CRASH_DATE'])
+        _write_partitions(df, tmp_dir, f'csv-{i:04d}')
+        digests.append(record_id_digests(df[ID_COL]))
+        rows = len(df)
+        sources.append({'path': path, 'mtime': os.path.getmtime(path), 'rows': rows})
+        print(f'{path}: {rows:,} rows')
+        del df
+    for path in list_partitions(tmp_dir):
+        compact_partition(path, 'part-0000')
+    _write_id_index(np.unique(np.concatenate(digests)), 0, tmp_dir)
+
+    manifest = {
+        'version': STORE_VERSION,
+        'sources': sources,
+        'rows': sum(s['rows'] for s in sources),
+        'built_at': time.time(),
+        'seconds': round(time.perf_counter() - start, 2),
+        'generation': 0,
+        'deltas': [],
+    }
+    write_manifest(manifest, tmp_dir)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return manifest
+
+
+def list_partitions(store_dir=STORE_DIR, newest_first=False):
+    partitions = []
+    for year_dir in os.listdir(store_dir):
+        if not year_dir.startswith('crash_year='):
+            continue
+        for month_dir in os.listdir(os.path.join(store_dir, year_dir)):
+            if month_dir.startswith('crash_month='):
+                year = int(year_dir.split('=')[1])
+                month = int(month_dir.split('=')[1])
+                partitions.append(((year, month), os.path.join(store_dir, year_dir, month_dir)))
+    partitions.sort(reverse=newest_first)
+    return [path for _, path in partitions]
+
+
+def partition_years(store_dir=STORE_DIR, newest_first=False):
+    # Partition directories grouped by crash year, for readers that scan a
+    # year's months in one call
+    return [list(paths) for _, paths in groupby(list_partitions(store_dir, newest_first), key=os.path.dirname)]
+
+
+def partition_bytes(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path) if f.endswith('.parquet'))
+
+
+def file_generation(name):
+    # part-NNNN files come from the full build (generation 0), gen-NNNNNN
+    # files from the incremental ingest of that generation
+    return int(name[len('gen-'):-len('.parquet')]) if name.startswith('gen-') else 0
+
+
+def _parquet_files(path, generation=None):
+    # Files of generations newer than `generation` are skipped, so a reader
+    # never picks up an ingest that was still being written when it started
+    return [os.path.join(path, name) for name in sorted(os.listdir(path))
+            if name.endswith('.parquet') and (generation is None or file_generation(name) <= generation)]
+
+
+def _scan(files, columns=None, row_filter=None):
+    import pyarrow.dataset as ds
+    return ds.dataset(files, schema=store_schema(), format='parquet').to_table(columns=columns, filter=row_filter)
+
+
+def read_files(files, columns=None):
+    # Every store file has the same schema, so any set of them is one scan
+    if columns is not None:
+        columns = [col for col in columns if col in CRASH_SCHEMA]
+    if not files:
+        return pd.DataFrame(columns=columns if columns is not None else list(CRASH_SCHEMA))
+    return _scan(files, columns).to_pandas()
+
+
+def read_partitions(paths, columns=None, generation=None):
+    return read_files([f for path in paths for f in _parquet_files(path, generation)], columns)
+
+
+def read_partition(path, columns=None, generation=None):
+    return read_partitions([path], columns, generation)
+
+
+def read_store(store_dir=STORE_DIR, columns=None, generation=None):
+    return read_partitions(list_partitions(store_dir), columns, generation)
+
+
+def read_deltas(deltas, store_dir=STORE_DIR, columns=None):
+    # Rows added by the given manifest 'deltas' entries
+    files = [os.path.join(store_dir, f) for delta in deltas for f in delta['files']]
+    return read_files(files, columns) if files else None
+
+
+def record_id_digests(ids):
+    # 64-bit blake2b digests of the record IDs, in input order. A fixed hash
+    # keeps the persisted index valid across Python and pandas versions; two
+    # IDs sharing a digest among tens of millions is vanishingly unlikely.
+    ids = pd.Series(ids).dropna().astype(str)
+    return np.frombuffer(b''.join(hashlib.blake2b(i.encode(), digest_size=8).digest() for i in ids), dtype='<u8')
+
+
+def _id_index_path(store_dir, generation):
+    return os.path.join(store_dir, ID_INDEX_DIR, f'gen-{generation:06d}.npy')
+
+
+def _write_id_index(digests, generation, store_dir):
+    # One sorted digest array per generation, holding the IDs it added
+    path = _id_index_path(store_dir, generation)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, np.sort(digests))
+    os.replace(path + '.tmp', path)
+
+
+def _scan_record_ids(ids, store_dir, generation):
+    # Stores built before the ID index: one scan of every partition's ID
+    # column, filtered in Arrow so only the matches are materialized
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    files = [f for path in list_partitions(store_dir) for f in _parquet_files(path, generation)]
+    if not files:
+        return pd.Series([], dtype=object)
+    table = _scan(files, [ID_COL], ds.field(ID_COL).isin(pa.array(ids, type=pa.string())))
+    return table.column(ID_COL).to_pandas()
+
+
+def stored_record_ids(ids, store_dir=STORE_DIR, generation=None):
+    # The given IDs that are already stored, whatever partition they are in
+    # (a corrected record may have moved to another crash month). Each
+    # generation's ID index is mapped and binary searched, so the cost grows
+    # with the number of IDs asked about, not with the stored history.
+    ids = pd.Series(ids).dropna().astype(str).reset_index(drop=True)
+    generation = store_generation(store_dir) if generation is None else generation
+    paths = [_id_index_path(store_dir, g) for g in range(generation + 1)]
+    if not all(os.path.exists(path) for path in paths):
+        return _scan_record_ids(ids, store_dir, generation)
+    digests = record_id_digests(ids)
+    found = np.zeros(len(ids), dtype=bool)
+    for path in paths:
+        index = np.load(path, mmap_mode='r')
+        if len(index):
+            positions = np.minimum(np.searchsorted(index, digests), len(index) - 1)
+            found |= index[positions] == digests
+    return ids[found]
+
+
+def write_generation(df, generation, store_dir=STORE_DIR):
+    # Files written here stay invisible until the manifest reaches this
+    # generation; leftovers of an ingest that never got there are removed first
+    for path in list_partitions(store_dir):
+        for name in os.listdir(path):
+            if name.endswith('.parquet') and file_generation(name) >= generation:
+                os.remove(os.path.join(path, name))
+    files = _write_partitions(df, store_dir, f'gen-{generation:06d}')
+    _write_id_index(np.unique(record_id_digests(df[ID_COL])), generation, store_dir)
+    return files
+
+
+def save_rollups(tables, generation, store_dir=STORE_DIR):
+    # The generation marker goes last: until it is written, load_rollups
+    # treats the directory as stale
+    out_dir = os.path.join(store_dir, ROLLUP_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+    marker = os.path.join(out_dir, ROLLUP_GENERATION)
+    if os.path.exists(marker):
+        os.remove(marker)
+    for name, table in tables.items():
+        table.to_parquet(os.path.join(out_dir, f'{name}.parquet'), index=False)
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump({'generation': generation}, f)
+
+
+def load_rollups(store_dir=STORE_DIR, generation=None):
+    # Rollups built for another data generation describe other data
+    rollup_dir = os.path.join(store_dir, ROLLUP_DIR)
+    marker = os.path.join(rollup_dir, ROLLUP_GENERATION)
+    if not os.path.exists(marker):
+        return None
+    with open(marker, 'r', encoding='utf-8') as f:
+        built_for = json.load(f)['generation']
+    if built_for != (store_generation(store_dir) if generation is None else generation):
+        return None
+    tables = {}
+    for name in os.listdir(rollup_dir):
+        if name.endswith('.parquet'):
+            tables[name[:-len('.parquet')]] = pd.read_parquet(os.path.join(rollup_dir, name))
+    return tables or None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the crash CSVs into the partitioned Parquet store.')
+    parser.add_argument('csv_files', nargs='*', default=CSV_FILES)
+    parser.add_argument('--store', default=STORE_DIR)
+    args = parser.parse_args()
+    manifest = ingest_csvs(args.csv_files, args.store)
+    print(f"Wrote {manifest['rows']:,} rows to {args.store} in {manifest['seconds']}s")
@@ -0,0 +1,176 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from crash_store import STORE_DIR
+
+SNAPSHOT_DIR = '_snapshots'
+CRASHES = 'crashes.arrow'
+ROLLUPS = 'rollups'
+# Filter and spatial arrays derived from the crashes, one directory each
+DERIVED = 'derived'
+# Generations kept on disk: the current one plus the one replicas may still
+# have mapped while they switch over
+KEEP_GENERATIONS = 2
+# Field metadata key telling the reader how to rebuild the pandas column
+KIND = b'crash_kind'
+
+# Published snapshots are uncompressed Arrow IPC files holding only fixed-width
+# buffers without validity bitmaps, so every replica on the host maps the same
+# page-cache pages read-only and builds its frame without copying: categoricals
+# are stored as codes, datetimes as int64 and booleans as uint8, and NaN stays
+# a float value rather than becoming null. Object columns (the record ids) map
+# to Arrow-backed strings. Derived arrays of other lengths get one
+# single-column file each.
+
+
+def _encode(name, values):
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        meta = {'kind': 'category', 'categories': dtype.categories.tolist(), 'ordered': bool(dtype.ordered)}
+        array = pa.array(values.cat.codes.to_numpy())
+    elif pd.api.types.is_datetime64_dtype(dtype):
+        meta = {'kind': 'datetime', 'dtype': str(dtype)}
+        array = pa.array(values.to_numpy().view('int64'))
+    elif pd.api.types.is_bool_dtype(dtype):
+        meta = {'kind': 'bool'}
+        array = pa.array(values.to_numpy().view('uint8'))
+    elif pd.api.types.is_numeric_dtype(dtype):
+        meta = {'kind': 'numeric'}
+        array = pa.array(values.to_numpy())
+    else:
+        meta = {'kind': 'string'}
+        array = pa.array(values.to_numpy(dtype=object), type=pa.large_string(), from_pandas=True)
+    return pa.field(name, array.type, metadata={KIND: json.dumps(meta)}), array
+
+
+def _decode(field, column):
+    meta = json.loads(field.metadata[KIND])
+    if meta['kind'] == 'string':
+        return pd.arrays.ArrowExtensionArray(column)
+    values = (column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()).to_numpy(zero_copy_only=True)
+    if meta['kind'] == 'category':
+        return pd.Categorical.from_codes(values, dtype=pd.CategoricalDtype(meta['categories'], meta['ordered']))
+    if meta['kind'] == 'datetime':
+        return values.view(meta['dtype'])
+    if meta['kind'] == 'bool':
+        return values.view(np.bool_)
+    return values
+
+
+def _write_table(table, path):
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _map_table(path):
+    # The arrays keep the memory map open for as long as they live
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def write_frame(df, path):
+    fields, arrays = zip(*(_encode(col, df[col]) for col in df.columns))
+    _write_table(pa.Table.from_arrays(list(arrays), schema=pa.schema(list(fields))), path)
+
+
+def map_frame(path):
+    table = _map_table(path)
+    columns = {field.name: _decode(field, table.column(i)) for i, field in enumerate(table.schema)}
+    return pd.DataFrame(columns, copy=False)
+
+
+def write_arrays(arrays, directory):
+    # arrays: name -> 1-d numeric numpy array
+    os.makedirs(directory)
+    for name, values in arrays.items():
+        _write_table(pa.table({name: pa.array(np.ascontiguousarray(values))}),
+                     os.path.join(directory, f'{name}.arrow'))
+
+
+def map_arrays(directory):
+    # Read-only numpy views of the mapped files
+    arrays = {}
+    for file_name in os.listdir(directory):
+        if file_name.endswith('.arrow'):
+            column = _map_table(os.path.join(directory, file_name)).column(0)
+            values = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+            arrays[file_name[:-len('.arrow')]] = values.to_numpy(zero_copy_only=True)
+    return arrays
+
+
+def _snapshot_root(store_dir):
+    return os.path.join(store_dir, SNAPSHOT_DIR)
+
+
+def snapshot_path(generation, store_dir=STORE_DIR):
+    return os.path.join(_snapshot_root(store_dir), f'gen-{generation:06d}')
+
+
+def published_generations(store_dir=STORE_DIR):
+    root = _snapshot_root(store_dir)
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(name[len('gen-'):]) for name in os.listdir(root)
+                  if name.startswith('gen-') and name[len('gen-'):].isdigit())
+
+
+def publish_snapshot(df, rollups, generation, store_dir=STORE_DIR, derived=None):
+    # Written into a private scratch directory and renamed into place, so a
+    # replica sees either no snapshot of this generation or the whole of it.
+    # When two processes publish the same generation the first rename wins.
+    final = snapshot_path(generation, store_dir)
+    if os.path.isdir(final):
+        return final
+    tmp = f'{final}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(os.path.join(tmp, ROLLUPS))
+    try:
+        write_frame(df, os.path.join(tmp, CRASHES))
+        for name, table in rollups.items():
+            write_frame(table.reset_index(drop=True), os.path.join(tmp, ROLLUPS, f'{name}.arrow'))
+        for name, arrays in (derived or {}).items():
+            write_arrays(arrays, os.path.join(tmp, DERIVED, name))
+        os.rename(tmp, final)
+    except OSError:
+        if not os.path.isdir(final):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    # Unlinking a mapped file leaves existing mappings intact on POSIX, so
+    # replicas still on an older generation keep working until they switch
+    for old in published_generations(store_dir)[:-KEEP_GENERATIONS]:
+        shutil.rmtree(snapshot_path(old, store_dir), ignore_errors=True)
+    return final
+
+
+def discard_snapshots(generation, store_dir=STORE_DIR):
+    # Snapshots from `generation` on belong to an ingest that never reached
+    # the manifest
+    for old in published_generations(store_dir):
+        if old >= generation:
+            shutil.rmtree(snapshot_path(old, store_dir), ignore_errors=True)
+
+
+def open_snapshot(generation, store_dir=STORE_DIR):
+    # Returns (df, rollups, derived arrays by structure) mapped from the
+    # snapshot of `generation`, or None when that generation has not been
+    # published
+    path = snapshot_path(generation, store_dir)
+    if not os.path.isdir(path):
+        return None
+    try:
+        df = map_frame(os.path.join(path, CRASHES))
+        rollup_dir = os.path.join(path, ROLLUPS)
+        rollups = {name[:-len('.arrow')]: map_frame(os.path.join(rollup_dir, name))
+                   for name in os.listdir(rollup_dir) if name.endswith('.arrow')}
+        derived_dir = os.path.join(path, DERIVED)
+        derived = {name: map_arrays(os.path.join(derived_dir, name))
+                   for name in (os.listdir(derived_dir) if os.path.isdir(derived_dir) else [])}
+    except OSError:
+        # Pruned between the check and the map
+        return None
+    return df, rollups, derived
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+
+class CompiledEncoder:
+    # Drop-in for a fitted LabelEncoder's transform/inverse_transform: the
+    # classes are compiled into a dict for single values and a hash index for
+    # whole columns, with no per-call validation. Values are matched on their
+    # string form, which is how every encoder in models/ was fit.
+    #
+    # unknown controls unseen values: None raises like LabelEncoder, a known
+    # class label maps them to that class, an int is used as the code as-is.
+    def __init__(self, label_encoder, unknown=None):
+        self.classes_ = np.asarray(label_encoder.classes_)
+        self._codes = {str(value): code for code, value in enumerate(self.classes_)}
+        self._index = pd.Index([str(value) for value in self.classes_])
+        if unknown is None or isinstance(unknown, (int, np.integer)) and not isinstance(unknown, bool):
+            self.unknown_code = unknown
+        elif str(unknown) in self._codes:
+            self.unknown_code = self._codes[str(unknown)]
+        else:
+            raise ValueError(f"Fallback label {unknown!r} is not one of the encoder's classes")
+
+    def _unseen(self, values):
+        raise ValueError(f"y contains previously unseen labels: {values}")
+
+    def encode(self, value):
+        code = self._codes.get(str(value))
+        if code is None:
+            if self.unknown_code is None:
+                self._unseen([value])
+            return self.unknown_code
+        return code
+
+    def encode_many(self, values):
+        values = pd.Series(values, copy=False).astype(str)
+        codes = self._index.get_indexer(values)
+        unseen = codes < 0
+        if unseen.any():
+            if self.unknown_code is None:
+                self._unseen(sorted(set(values[unseen]))[:5])
+            codes[unseen] = self.unknown_code
+        return codes
+
+    def decode(self, codes):
+        return self.classes_[np.asarray(codes)]
+
+
+class EncoderSet:
+    def __init__(self, label_encoders, columns=None, unknown=None):
+        self.label_encoders = label_encoders
+        self.columns = list(columns) if columns is not None else list(label_encoders)
+        unknown = unknown if isinstance(unknown, dict) else {col: unknown for col in label_encoders}
+        self.encoders = {col: CompiledEncoder(le, unknown.get(col)) for col, le in label_encoders.items()}
+
+    def __getitem__(self, column):
+        return self.encoders[column]
+
+    def encode_row(self, row, columns=None):
+        # row maps column -> value; columns without an encoder pass through
+        columns = self.columns if columns is None else columns
+        return np.array([[self.encoders[col].encode(row[col]) if col in self.encoders else row[col]
+                          for col in columns]])
+
+    def encode_frame(self, df, columns=None):
+        columns = self.columns if columns is None else columns
+        missing = [col for col in columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing input columns: {', '.join(missing)}")
+        return pd.DataFrame({col: self.encoders[col].encode_many(df[col]) if col in self.encoders else df[col]
+                             for col in columns}, index=df.index)
+
+    def decode(self, column, codes):
+        return self.encoders[column].decode(codes)
+
+
+def fallback_columns(label_encoders, label):
+    # Columns that have `label` among their classes
+    return [col for col, le in label_encoders.items() if str(label) in {str(value) for value in le.classes_}]
+
+
+def fallback_classes(label_encoders, label):
+    # unknown= for an EncoderSet over many columns: unseen values become
+    # `label` in the columns that have that class. The other columns still
+    # reject unseen values, since any code there is a real category.
+    columns = set(fallback_columns(label_encoders, label))
+    return {col: label if col in columns else None for col in label_encoders}
+
@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+from perf import ENABLED as PERF_ENABLED, record_payload
+
+# Most points any one trace may send to the browser
+MAX_POINTS = int(os.environ.get('CRASH_MAX_POINTS', '2000'))
+CACHE_ENTRIES = int(os.environ.get('CRASH_FIGURE_CACHE_SIZE', '512'))
+TABLE_PAGE_ROWS = 100
+# Per-point trace attributes that have to follow the points kept
+POINT_ATTRS = ['text', 'hovertext', 'customdata']
+
+
+def _per_point(trace, attr, n_points):
+    value = trace[attr]
+    return value is not None and not isinstance(value, str) and len(value) == n_points
+
+
+def cap_points(fig, max_points=MAX_POINTS):
+    # Traces over the budget are cut down before serialization: bars and pie
+    # slices keep the largest max_points - 1 in their original order and sum
+    # the rest into "Other", scatter traces are evenly downsampled
+    for trace in fig.data:
+        if trace.type == 'pie':
+            labels, values = 'labels', 'values'
+        elif trace.type == 'bar':
+            labels, values = ('y', 'x') if trace.orientation == 'h' else ('x', 'y')
+        elif trace.type in ('scatter', 'scattergl'):
+            n_points = len(trace.x) if trace.x is not None else 0
+            if n_points > max_points:
+                keep = np.linspace(0, n_points - 1, max_points).astype(int)
+                trace.update({attr: np.asarray(trace[attr], dtype=object)[keep]
+                              for attr in ['x', 'y'] + POINT_ATTRS if _per_point(trace, attr, n_points)})
+            continue
+        else:
+            continue
+        if trace[values] is None or len(trace[values]) <= max_points:
+            continue
+        n_points = len(trace[values])
+        amounts = np.asarray(trace[values], dtype='float64')
+        keep = np.sort(np.argsort(-amounts, kind='stable')[:max_points - 1])
+        rest = np.ones(n_points, dtype=bool)
+        rest[keep] = False
+        update = {
+            labels: np.asarray(trace[labels], dtype=object)[keep].tolist() + ['Other'],
+            values: amounts[keep].tolist() + [amounts[rest].sum()],
+        }
+        for attr in POINT_ATTRS:
+            if _per_point(trace, attr, n_points):
+                update[attr] = np.asarray(trace[attr], dtype=object)[keep].tolist() + [None]
+        trace.update(update)
+    return fig
+
+
+def payload_bytes(fig):
+    # Size of the spec st.plotly_chart sends for fig
+    import plotly.io as pio
+    return len(pio.to_json(fig, validate=False))
+
+
+class _CachedFigure:
+    def __init__(self, fig):
+        self.fig = fig
+        # Measured on first render when instrumentation is on
+        self.nbytes = None
+
+
+class FigureCache:
+    # Process-wide LRU of finished figures (points already capped) keyed by
+    # chart id, data version and filter state, so a rerun with filters some
+    # session already used skips building the figure. The Figure object is
+    # kept: st.plotly_chart serializes a Figure as is, while a dict or JSON
+    # spec would be rebuilt and validated trace by trace on every render.
+    # Cached figures are shared between sessions and must not be mutated.
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        # Built outside the lock; two sessions racing on a key both build it
+        entry = _CachedFigure(cap_points(build()))
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+figure_cache = FigureCache()
+
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def plotly_chart(chart_id, key, build, cached=True, **kwargs):
+    # build() -> go.Figure runs only on a cache miss; pass cached=False for
+    # data that is still changing, e.g. partial rollups during the load
+    if cached:
+        entry = figure_cache.get_or_build((chart_id,) + tuple(_hashable(v) for v in key), build)
+    else:
+        entry = _CachedFigure(cap_points(build()))
+    if PERF_ENABLED:
+        if entry.nbytes is None:
+            entry.nbytes = payload_bytes(entry.fig)
+        record_payload(chart_id, entry.nbytes)
+    st.plotly_chart(entry.fig, **kwargs)
+
+
+def paginated_dataframe(df, key, page_rows=TABLE_PAGE_ROWS, **kwargs):
+    # Only the selected page of rows is sent to the browser
+    n_pages = max(1, -(-len(df) // page_rows))
+    page = st.number_input(f"Page (of {n_pages:,})", min_value=1, max_value=n_pages, value=1,
+                           key=key) if n_pages > 1 else 1
+    start = (page - 1) * page_rows
+    rows = df.iloc[start:start + page_rows]
+    st.caption(f"Rows {min(start + 1, len(df)):,}-{start + len(rows):,} of {len(df):,}")
+    record_payload(key, int(rows.memory_usage(deep=True).sum()))
+    st.dataframe(rows, **kwargs)
@@ -0,0 +1,144 @@
+import numpy as np
+
+BATCH_ROWS = 65_536
+
+
+class CompactForest:
+    # A fitted RandomForestClassifier flattened into a few contiguous arrays.
+    # Only split nodes are stored; a child pointer c < 0 is leaf -c - 1, and
+    # leaves hold the per-tree class probabilities sklearn would compute.
+    # Inputs are cast to float32 and compared against the float64
+    # thresholds, probabilities are summed in tree order and divided by the
+    # number of trees, so results are bit-identical to sklearn's predict and
+    # predict_proba with n_jobs=1 (with threads sklearn's summation order,
+    # and so its last bit, is not fixed either).
+    def __init__(self, model):
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise ValueError("Only single-output forests can be compacted")
+        self.classes_ = model.classes_
+        self.n_classes_ = len(model.classes_)
+        self.n_features_in_ = model.n_features_in_
+        if hasattr(model, 'feature_names_in_'):
+            self.feature_names_in_ = model.feature_names_in_
+        self.feature_importances_ = model.feature_importances_
+        self.n_trees = len(model.estimators_)
+
+        features, thresholds, lefts, rights, missing_left, values, roots = [], [], [], [], [], [], []
+        n_splits = n_leaves = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            is_split = tree.children_left >= 0
+            # Old node id -> split index or encoded leaf
+            split_ids = np.cumsum(is_split) - 1 + n_splits
+            leaf_ids = -(np.cumsum(~is_split) - 1 + n_leaves) - 1
+            new_ids = np.where(is_split, split_ids, leaf_ids)
+
+            features.append(tree.feature[is_split])
+            thresholds.append(tree.threshold[is_split])
+            lefts.append(new_ids[tree.children_left[is_split]])
+            rights.append(new_ids[tree.children_right[is_split]])
+            if hasattr(tree, 'missing_go_to_left'):
+                missing_left.append(tree.missing_go_to_left[is_split].astype(bool))
+            else:
+                missing_left.append(np.zeros(int(is_split.sum()), dtype=bool))
+            values.append(self._leaf_probabilities(tree.value[~is_split, 0, :self.n_classes_]))
+            roots.append(new_ids[0])
+            n_splits += int(is_split.sum())
+            n_leaves += int((~is_split).sum())
+
+        self.feature = np.concatenate(features).astype(np.int32)
+        self.threshold = np.concatenate(thresholds).astype(np.float64)
+        self.left = np.concatenate(lefts).astype(np.int32)
+        self.right = np.concatenate(rights).astype(np.int32)
+        self.missing_left = np.concatenate(missing_left)
+        self.has_missing = bool(self.missing_left.any())
+        self.values = np.ascontiguousarray(np.concatenate(values), dtype=np.float64)
+        self.roots = np.array(roots, dtype=np.int32)
+
+    @staticmethod
+    def _leaf_probabilities(value):
+        # Repeats DecisionTreeClassifier.predict_proba on the leaf values,
+        # including its row normalisation when this sklearn still does it
+        # (tree values hold counts before 1.4, fractions from 1.4 on)
+        proba = np.array(value, dtype=np.float64)
+        if _normalizes_proba():
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+        return proba
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in [self.feature, self.threshold, self.left, self.right,
+                                      self.missing_left, self.values, self.roots])
+
+    def _go_left(self, x, nodes):
+        go_left = x <= self.threshold[nodes]
+        if self.has_missing:
+            go_left |= np.isnan(x) & self.missing_left[nodes]
+        return go_left
+
+    def apply(self, X):
+        # Leaf reached in every tree, shape (n_trees, n_rows): all trees and
+        # rows advance one level per step
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = len(X)
+        nodes = np.repeat(self.roots, n_rows)
+        rows = np.tile(np.arange(n_rows), self.n_trees)
+        active = np.flatnonzero(nodes >= 0)
+        while len(active):
+            current = nodes[active]
+            x = X[rows[active], self.feature[current]]
+            nodes[active] = np.where(self._go_left(x, current), self.left[current], self.right[current])
+            active = active[nodes[active] >= 0]
+        return (-nodes - 1).reshape(self.n_trees, n_rows)
+
+    def predict_proba(self, X):
+        X = _as_array(X)
+        if len(X) == 1:
+            return self.predict_proba_one(X[0])[np.newaxis]
+        proba = np.zeros((len(X), self.n_classes_), dtype=np.float64)
+        for start in range(0, len(X), BATCH_ROWS):
+            leaves = self.apply(X[start:start + BATCH_ROWS])
+            out = proba[start:start + BATCH_ROWS]
+            for tree_leaves in leaves:
+                out += self.values[tree_leaves]
+        proba /= self.n_trees
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def predict_proba_one(self, x):
+        # One row, as a 1-D sequence of feature values
+        x = np.asarray(_as_array(x), dtype=np.float32).ravel()
+        nodes = self.roots.copy()
+        active = np.flatnonzero(nodes >= 0)
+        while len(active):
+            current = nodes[active]
+            values = x[self.feature[current]]
+            nodes[active] = np.where(self._go_left(values, current), self.left[current], self.right[current])
+            active = active[nodes[active] >= 0]
+        # cumsum adds strictly in tree order, like the batch path
+        return np.cumsum(self.values[-nodes - 1], axis=0)[-1] / self.n_trees
+
+    def predict_one(self, x):
+        return self.classes_[np.argmax(self.predict_proba_one(x))]
+
+
+def _as_array(X):
+    return X.to_numpy() if hasattr(X, 'to_numpy') else X
+
+
+def _normalizes_proba():
+    import sklearn
+    from sklearn.utils.fixes import parse_version
+    return parse_version(sklearn.__version__).release < (1, 4)
+
+
+def compact_forest(model):
+    # Registry wrapper: random forests are served compacted, other models as loaded
+    from sklearn.ensemble import RandomForestClassifier
+    if isinstance(model, RandomForestClassifier) and getattr(model, 'n_outputs_', 1) == 1:
+        return CompactForest(model)
+    return model
@@ -0,0 +1,75 @@
+import argparse
+import time
+
+import pandas as pd
+
+import crash_store
+import dataset_snapshot
+from rollups import ROLLUP_TABLES, build_rollup_cube, combine_rollups
+from utilities import CRASH_SCHEMA, RAW_SCHEMA, apply_schema, preprocess_crash_data
+
+ID_COL = crash_store.ID_COL
+
+
+def ingest_delta(path, store_dir=crash_store.STORE_DIR):
+    # Appends the records of a daily export that are not in the store yet as
+    # a new data generation. Only the delta is preprocessed; deduplication
+    # looks its IDs up in the store's ID index.
+    start = time.perf_counter()
+    manifest = crash_store.read_manifest(store_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No crash store in {store_dir}; build it with `python crash_store.py` first")
+    previous = manifest.get('generation', 0)
+    generation = previous + 1
+
+    df = pd.read_csv(path, low_memory=False)
+    received = len(df)
+    # A record repeated within the export keeps its latest version
+    df = df.drop_duplicates(ID_COL, keep='last')
+    df['CRASH_DATE'] = crash_store.parse_crash_date(df['CRASH_DATE'])
+    df = df[~df[ID_COL].astype(str).isin(crash_store.stored_record_ids(df[ID_COL], store_dir, previous))]
+    if df.empty:
+        print(f"{path}: {received:,} rows, none new")
+        return manifest
+
+    files = crash_store.write_generation(df, generation, store_dir)
+    # Snapshots are not published here, which would mean rewriting the whole
+    # history: the first dashboard replica to append the delta publishes the
+    # new generation. Only leftovers of an earlier failed ingest are dropped.
+    dataset_snapshot.discard_snapshots(generation, store_dir)
+
+    # Rollups are extended in place; when none are stored for the previous
+    # generation the next dashboard load rebuilds them from the partitions
+    rollups = crash_store.load_rollups(store_dir, previous)
+    if rollups is not None and not set(ROLLUP_TABLES) <= set(rollups):
+        rollups = None
+    if rollups is not None:
+        part = df[[col for col in df.columns if col in CRASH_SCHEMA]].copy()
+        apply_schema(part, RAW_SCHEMA)
+        preprocess_crash_data(part, report=False)
+        crash_store.save_rollups(combine_rollups([rollups, build_rollup_cube(part)]), generation, store_dir)
+
+    manifest.setdefault('deltas', []).append({
+        'generation': generation,
+        'path': path,
+        'received': received,
+        'rows': len(df),
+        'files': files,
+        'ingested_at': time.time(),
+        'seconds': round(time.perf_counter() - start, 2),
+    })
+    manifest['rows'] += len(df)
+    manifest['generation'] = generation
+    crash_store.write_manifest(manifest, store_dir)
+    print(f"{path}: {received:,} rows, {len(df):,} new -> generation {generation} "
+          f"in {manifest['deltas'][-1]['seconds']}s")
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Append a daily crash export to the crash data store.')
+    parser.add_argument('delta_files', nargs='+')
+    parser.add_argument('--store', default=crash_store.STORE_DIR)
+    args = parser.parse_args()
+    for delta_file in args.delta_files:
+        ingest_delta(delta_file, args.store)
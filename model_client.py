@@ -0,0 +1,111 @@
+import json
+import os
+import socket
+import time
+
+import pandas as pd
+
+from model_registry import RISK_FEATURES, registry
+from model_server import SOCKET_PATH, model_info, predict_records
+from batch_predict import INPUT_COLS, PREDICTION_COL, predict_batch
+from model_compare import available_models, compare_models, record_timings
+from perf import span
+from prediction_cache import cached_predict
+
+TIMEOUT = float(os.environ.get('CRASH_MODEL_TIMEOUT', '10'))
+# Rows per request when a whole file is scored through the server
+BATCH_CHUNK_ROWS = int(os.environ.get('CRASH_MODEL_BATCH_CHUNK', '5000'))
+# After a failed connect, predict in-process for this long before trying again
+RETRY_SECONDS = 30
+
+_server_down_until = 0.0
+
+
+def _to_json(value):
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def _request(payload, path=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(TIMEOUT)
+        sock.connect(path or SOCKET_PATH)
+        sock.sendall(json.dumps(payload, default=_to_json).encode() + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("Model server closed the connection")
+    response = json.loads(line)
+    if 'error' in response:
+        raise ValueError(response['error'])
+    return response
+
+
+def _call(payload, fallback):
+    # The model server when one is running, otherwise this process's registry
+    global _server_down_until
+    if not hasattr(socket, 'AF_UNIX') or time.monotonic() < _server_down_until:
+        return None, fallback()
+    try:
+        return _request(payload), None
+    except OSError:
+        _server_down_until = time.monotonic() + RETRY_SECONDS
+        return None, fallback()
+
+
+def _predict_uncached(name, records):
+    response, local = _call({'op': 'predict', 'model': name, 'rows': records}, lambda: predict_records(name, records))
+    return response['predictions'] if response is not None else local
+
+
+def predict(name, records):
+    # Repeated scenarios are answered from the process-wide prediction cache
+    columns = RISK_FEATURES if name == 'riskModel' else INPUT_COLS
+    with span(f'predict.{name}'):
+        return cached_predict(name, records, registry.get(name, 'encoders'), columns,
+                              lambda missing: _predict_uncached(name, missing))
+
+
+def predict_frame(name, df, unknown=None, chunk_size=BATCH_CHUNK_ROWS):
+    # Scores a whole frame of raw inputs in chunks on the model server, so a
+    # dashboard process never loads the model itself; a chunk the server
+    # can't take is scored in-process
+    def local(chunk):
+        return predict_batch(chunk, registry.get(name), registry.get(name, 'encoders'), unknown=unknown).tolist()
+
+    missing = [col for col in INPUT_COLS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing input columns: {', '.join(missing)}")
+    labels = []
+    with span(f'predict.batch.{name}'):
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            payload = {'op': 'batch', 'model': name, 'unknown': unknown,
+                       'rows': chunk[INPUT_COLS].to_dict('records')}
+            response, predictions = _call(payload, lambda: local(chunk))
+            labels.extend(response['predictions'] if response is not None else predictions)
+    return pd.Series(labels, index=df.index, dtype=object, name=PREDICTION_COL)
+
+
+def compare(input_data, names=None):
+    # Comparison mode on the model server, which already holds every model;
+    # in-process only when no server is running
+    names = available_models() if names is None else names
+    start = time.perf_counter()
+    with span('predict.compare'):
+        response, local = _call({'op': 'compare', 'models': names, 'input': input_data},
+                                lambda: compare_models(input_data, names))
+    results = response['results'] if response is not None else local
+    record_timings(results)
+    return results, time.perf_counter() - start
+
+
+def info(name):
+    response, local = _call({'op': 'info', 'model': name}, lambda: model_info(name))
+    return response['info'] if response is not None else local
+
+
+def server_stats():
+    # Shares the connect backoff with predictions, so a server that is down
+    # is not retried on every rerun
+    response, _ = _call({'op': 'stats'}, lambda: None)
+    return response['stats'] if response is not None else None
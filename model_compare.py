@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch_predict import CRASH_TYPE_MODELS, INPUT_COLS, TARGET_COL
+from model_registry import registry
+
+COMPARE_MODELS = CRASH_TYPE_MODELS + ['xgboost']
+# The XGBoost pipeline takes raw features; these were numeric when it was fit
+XGB_NUMERIC_COLS = ['POSTED_SPEED_LIMIT', 'CRASH_DAY_OF_WEEK', 'CRASH_HOUR', 'CRASH_MONTH', 'AGE']
+# Its target encoder was not saved. The label-encoded models were fit on the
+# same FIRST_CRASH_TYPE values, so their sorted classes name its class codes.
+XGB_LABELS_FROM = 'random_forest'
+
+_executor = None
+_executor_lock = threading.Lock()
+_timings = {name: deque(maxlen=100) for name in COMPARE_MODELS}
+_timings_lock = threading.Lock()
+
+
+def _pool():
+    # Only a dashboard process comparing while no model server is running
+    # needs one; the server passes its own worker pool
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=len(COMPARE_MODELS), thread_name_prefix='compare')
+        return _executor
+
+
+def _encoder_key(encoders):
+    return tuple((col, tuple(encoders[col].classes_)) for col in INPUT_COLS if col in encoders.encoders)
+
+
+def _encode_inputs(input_data, names):
+    # One encoded row per distinct set of encoders, shared by the models that
+    # were fit with the same classes; the raw frame for XGBoost. A model whose
+    # encoders reject the input gets the exception instead.
+    raw = pd.DataFrame([input_data], columns=INPUT_COLS)
+    encoded, by_key = {}, {}
+    for name in names:
+        try:
+            if name == 'xgboost':
+                encoded[name] = raw.assign(**{col: pd.to_numeric(raw[col]) for col in XGB_NUMERIC_COLS})
+                continue
+            encoders = registry.get(name, 'encoders')
+            key = _encoder_key(encoders)
+            if key not in by_key:
+                by_key[key] = encoders.encode_frame(raw, INPUT_COLS)
+            encoded[name] = by_key[key]
+        except Exception as e:
+            encoded[name] = e
+    return encoded
+
+
+def _class_labels(name, model):
+    if name == 'xgboost':
+        labels = registry.get(XGB_LABELS_FROM, 'encoders')[TARGET_COL].classes_
+        return labels[np.asarray(model.classes_)] if len(model.classes_) <= len(labels) else model.classes_
+    return registry.get(name, 'encoders').decode(TARGET_COL, model.classes_)
+
+
+def _score(name, X):
+    if isinstance(X, Exception):
+        raise X
+    start = time.perf_counter()
+    model = registry.get(name)
+    proba = model.predict_proba(X)[0]
+    labels = _class_labels(name, model)
+    # Plain values, so the model server can send results back as JSON
+    return {
+        'model': name,
+        'prediction': str(labels[int(np.argmax(proba))]),
+        'probabilities': {str(label): float(p) for label, p in zip(labels, proba)},
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def available_models():
+    return [name for name in COMPARE_MODELS if registry.is_available(name)]
+
+
+def compare_models(input_data, names=None, executor=None):
+    # Scores one input with every model on the thread pool; the wall time is
+    # close to the slowest model's rather than the sum over models. Runs in
+    # the model server, or in-process when none is running.
+    names = available_models() if names is None else names
+    executor = executor or _pool()
+    encoded = _encode_inputs(input_data, names)
+    futures = {name: executor.submit(_score, name, encoded[name]) for name in names}
+    results = []
+    for name, future in futures.items():
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append({'model': name, 'prediction': None, 'probabilities': None, 'seconds': None,
+                            'error': f'{type(e).__name__}: {e}'})
+    return results
+
+
+def record_timings(results):
+    with _timings_lock:
+        for result in results:
+            if result['seconds'] is not None and result['model'] in _timings:
+                _timings[result['model']].append(result['seconds'])
+
+
+def timing_stats():
+    with _timings_lock:
+        timings = {name: list(values) for name, values in _timings.items() if values}
+    return [{
+        'model': name,
+        'calls': len(values),
+        'p50_ms': np.percentile(values, 50) * 1e3,
+        'max_ms': max(values) * 1e3,
+    } for name, values in timings.items()]
@@ -0,0 +1,127 @@
+import os
+import threading
+import time
+
+from encoders import CompiledEncoder, EncoderSet
+from forest import compact_forest
+from perf import span
+
+# CRASH_MODEL_DIR points the registry at another artifact tree, e.g. the
+# synthetic models the benchmark suite trains
+MODEL_DIR = os.environ.get('CRASH_MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+
+# model name -> artifact -> (path relative to MODEL_DIR, post-load wrapper)
+MODEL_ARTIFACTS = {
+    'random_forest': {
+        'model': ('random_forest/RFclassifier.joblib', compact_forest),
+        'encoders': ('random_forest/RF_encoders.joblib', EncoderSet),
+    },
+    'categoricalNB': {
+        'model': ('categoricalNB/Categorail_NB.joblib', None),
+        'encoders': ('categoricalNB/NB_encoders.joblib', EncoderSet),
+    },
+    'lightGBM': {
+        'model': ('lightGBM/lightGBM.joblib', None),
+        'encoders': ('lightGBM/LGBM_encoders.joblib', EncoderSet),
+    },
+    'xgboost': {
+        'model': ('xgboost/XGBdump.joblib', None),
+    },
+    'riskModel': {
+        'model': ('riskModel/model.pkl', compact_forest),
+        'encoders': ('riskModel/encoders.pkl', EncoderSet),
+        'target_encoder': ('riskModel/target_encoder.pkl', CompiledEncoder),
+    },
+}
+
+# Same order as train_risk_model.FEATURES, which the risk model was fit on
+RISK_FEATURES = ['POSTED_SPEED_LIMIT', 'WEATHER_CONDITION', 'LIGHTING_CONDITION',
+                 'ROADWAY_SURFACE_COND', 'DAMAGE_VALUE', 'NUM_UNITS', 'CRASH_HOUR',
+                 'FIRST_CRASH_TYPE']
+
+# Models the preload scheduler loads when the server starts, e.g. CRASH_PREWARM_MODELS=random_forest,riskModel
+PREWARM_MODELS = [m for m in os.environ.get('CRASH_PREWARM_MODELS', 'random_forest,riskModel').split(',') if m]
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+class _Entry:
+    def __init__(self, path, wrapper):
+        self.path = path
+        self.wrapper = wrapper
+        self.value = None
+        self.mtime = None
+        self.load_seconds = None
+        self.memory_bytes = None
+        self.loads = 0
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    # Lazily loads model artifacts once per process and hands the same object to
+    # every session. An artifact is reloaded when its file's mtime changes.
+    def __init__(self, artifacts=MODEL_ARTIFACTS, model_dir=MODEL_DIR):
+        self._entries = {
+            (name, artifact): _Entry(os.path.join(model_dir, path), wrapper)
+            for name, spec in artifacts.items()
+            for artifact, (path, wrapper) in spec.items()
+        }
+
+    def names(self):
+        return list(dict.fromkeys(name for name, _ in self._entries))
+
+    def artifacts(self, name):
+        return [artifact for model, artifact in self._entries if model == name]
+
+    def is_available(self, name):
+        return all(os.path.exists(self._entries[name, a].path) for a in self.artifacts(name))
+
+    def version(self, name, artifact='model'):
+        return os.path.getmtime(self._entries[name, artifact].path)
+
+    def get(self, name, artifact='model'):
+        entry = self._entries[name, artifact]
+        mtime = os.path.getmtime(entry.path)
+        if entry.value is not None and entry.mtime == mtime:
+            return entry.value
+        with entry.lock:
+            if entry.value is None or entry.mtime != mtime:
+                rss_before = _rss_bytes()
+                start = time.perf_counter()
+                with span(f'model.load.{name}'):
+                    # joblib, and with it the model's framework, is imported
+                    # on the first load rather than by every page
+                    import joblib
+                    value = joblib.load(entry.path)
+                    if entry.wrapper is not None:
+                        value = entry.wrapper(value)
+                entry.load_seconds = time.perf_counter() - start
+                rss_after = _rss_bytes()
+                # RSS delta is approximate when several artifacts load at once
+                entry.memory_bytes = rss_after - rss_before if rss_before is not None else None
+                entry.value, entry.mtime = value, mtime
+                entry.loads += 1
+            return entry.value
+
+    def load(self, name):
+        return {artifact: self.get(name, artifact) for artifact in self.artifacts(name)}
+
+    def stats(self):
+        return [{
+            'model': name,
+            'artifact': artifact,
+            'path': os.path.relpath(entry.path),
+            'loaded': entry.value is not None,
+            'loads': entry.loads,
+            'load_seconds': entry.load_seconds,
+            'memory_mb': entry.memory_bytes / 2**20 if entry.memory_bytes is not None else None,
+        } for (name, artifact), entry in self._entries.items()]
+
+
+registry = ModelRegistry()
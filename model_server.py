@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch_predict import CRASH_TYPE_MODELS, INPUT_COLS, TARGET_COL, with_fallback
+from model_compare import COMPARE_MODELS, compare_models
+from model_registry import RISK_FEATURES, registry
+
+SOCKET_PATH = os.environ.get('CRASH_MODEL_SOCKET', '/tmp/crash-model-server.sock')
+MAX_BATCH_ROWS = int(os.environ.get('CRASH_MODEL_MAX_BATCH', '256'))
+MAX_WAIT_MS = float(os.environ.get('CRASH_MODEL_MAX_WAIT_MS', '5'))
+
+SERVED_MODELS = CRASH_TYPE_MODELS + ['riskModel']
+
+
+def predict_records(name, records, unknown=None):
+    # Raw input rows (column -> value) to predicted labels; used by the
+    # server for each micro-batch and by the client when no server is running.
+    # unknown= is the batch_predict fallback for values the encoders never saw.
+    encoders = registry.get(name, 'encoders')
+    df = pd.DataFrame.from_records(records)
+    if name == 'riskModel':
+        codes = registry.get(name).predict(encoders.encode_frame(df, RISK_FEATURES))
+        return registry.get(name, 'target_encoder').decode(codes).tolist()
+    codes = registry.get(name).predict(with_fallback(encoders, unknown).encode_frame(df, INPUT_COLS))
+    return encoders.decode(TARGET_COL, codes).tolist()
+
+
+def model_info(name):
+    model = registry.get(name)
+    importances = getattr(model, 'feature_importances_', None)
+    return {
+        'features': RISK_FEATURES if name == 'riskModel' else INPUT_COLS,
+        'feature_importances': np.asarray(importances).tolist() if importances is not None else None,
+    }
+
+
+class MicroBatcher:
+    # Requests for one model queue up here; a batch is closed when it holds
+    # max_rows rows or the first request has waited max_wait seconds, and is
+    # predicted in one call on the worker pool.
+    def __init__(self, name, executor, max_rows=MAX_BATCH_ROWS, max_wait=MAX_WAIT_MS / 1000):
+        self.name = name
+        self.executor = executor
+        self.max_rows = max_rows
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.predict_seconds = 0.0
+
+    async def predict(self, records):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((records, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        rows = len(batch[0][0])
+        deadline = loop.time() + self.max_wait
+        while rows < self.max_rows:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            records = [record for request, _ in batch for record in request]
+            start = time.perf_counter()
+            try:
+                labels = await loop.run_in_executor(self.executor, predict_records, self.name, records)
+            except Exception:
+                # One bad request (e.g. an unseen category) must not fail the
+                # others in its batch, so retry them one by one
+                for request, future in batch:
+                    try:
+                        result = await loop.run_in_executor(self.executor, predict_records, self.name, request)
+                    except Exception as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            else:
+                offset = 0
+                for request, future in batch:
+                    future.set_result(labels[offset:offset + len(request)])
+                    offset += len(request)
+            self.predict_seconds += time.perf_counter() - start
+            self.requests += len(batch)
+            self.rows += len(records)
+            self.batches += 1
+
+    def stats(self):
+        return {
+            'model': self.name,
+            'requests': self.requests,
+            'rows': self.rows,
+            'batches': self.batches,
+            'mean_batch_rows': self.rows / self.batches if self.batches else None,
+            'predict_seconds': round(self.predict_seconds, 3),
+        }
+
+
+class ModelServer:
+    def __init__(self, models=SERVED_MODELS, max_rows=MAX_BATCH_ROWS, max_wait_ms=MAX_WAIT_MS, workers=None):
+        self.models = [name for name in models if registry.is_available(name)]
+        self.executor = ThreadPoolExecutor(max_workers=workers or len(self.models) or 1, thread_name_prefix='predict')
+        self.batchers = {name: MicroBatcher(name, self.executor, max_rows, max_wait_ms / 1000) for name in self.models}
+        # Comparison mode also covers the XGBoost pipeline, which is not served on its own
+        self.compared = [name for name in COMPARE_MODELS if registry.is_available(name)]
+
+    async def _respond(self, request):
+        op = request.get('op', 'predict')
+        if op == 'stats':
+            return {'stats': [batcher.stats() for batcher in self.batchers.values()]}
+        if op == 'compare':
+            # Waits on the worker pool, so it runs on the loop's default executor
+            names = [name for name in request.get('models') or self.compared if name in self.compared]
+            results = await asyncio.get_running_loop().run_in_executor(
+                None, compare_models, request['input'], names, self.executor)
+            return {'results': results}
+        name = request.get('model')
+        if name not in self.batchers:
+            return {'error': f"Model {name!r} is not served; available: {', '.join(self.batchers)}"}
+        if op == 'info':
+            return {'info': model_info(name)}
+        try:
+            if op == 'batch':
+                # A chunk of an uploaded file is a batch already; it skips the
+                # micro-batcher and goes straight to the worker pool
+                return {'predictions': await asyncio.get_running_loop().run_in_executor(
+                    self.executor, predict_records, name, request['rows'], request.get('unknown'))}
+            return {'predictions': await self.batchers[name].predict(request['rows'])}
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'}
+
+    async def handle(self, reader, writer):
+        # Newline-delimited JSON, one response per request line
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self._respond(json.loads(line))
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, path=SOCKET_PATH):
+        for name in dict.fromkeys(self.models + self.compared):
+            registry.load(name)
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.handle, path=path)
+        for batcher in self.batchers.values():
+            asyncio.ensure_future(batcher.run())
+        print(f"Serving {', '.join(self.models)} on {path}")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the crash models to every dashboard process on this host.')
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    parser.add_argument('--models', nargs='+', default=SERVED_MODELS)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH_ROWS, help='rows per micro-batch')
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS, help='longest a request waits for a batch to fill')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+    try:
+        asyncio.run(ModelServer(args.models, args.max_batch, args.max_wait_ms, args.workers).serve(args.socket))
+    except KeyboardInterrupt:
+        pass
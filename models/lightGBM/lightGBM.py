@@ -8,10 +8,12 @@ Original file is located at
 """
 
 import pandas as pd
-import joblib
 
-label_encoders = joblib.load('LGBM_encoders.joblib')
-nb_model = joblib.load('lightGBM.joblib')
+# Run from the repository root: python -m models.lightGBM.lightGBM
+from model_registry import registry
+
+label_encoders = registry.get('lightGBM', 'encoders')
+nb_model = registry.get('lightGBM')
 
 input_cols = ['POSTED_SPEED_LIMIT', 'WEATHER_CONDITION', 'LIGHTING_CONDITION',
        'TRAFFICWAY_TYPE', 'ALIGNMENT',
@@ -37,9 +39,6 @@ new_sample = {
     'AGE': '35.0'
 }
 
-new_df = pd.DataFrame([new_sample])
-for col in input_cols:
-    val = str(new_df.at[0, col])
-    new_df[col] = label_encoders[col].transform([val])
+new_df = pd.DataFrame(label_encoders.encode_row(new_sample, input_cols), columns=input_cols)
 prediction = nb_model.predict(new_df)
-print(f"Accident type: {label_encoders['FIRST_CRASH_TYPE'].inverse_transform(prediction)[0]}")
\ No newline at end of file
+print(f"Accident type: {label_encoders.decode('FIRST_CRASH_TYPE', prediction)[0]}")
\ No newline at end of file
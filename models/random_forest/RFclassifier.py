@@ -8,10 +8,12 @@ Original file is located at
 """
 
 import pandas as pd
-import joblib
 
-label_encoders = joblib.load('RF_encoders.joblib')
-model = joblib.load('RFclassifier.joblib')
+# Run from the repository root: python -m models.random_forest.RFclassifier
+from model_registry import registry
+
+label_encoders = registry.get('random_forest', 'encoders')
+model = registry.get('random_forest')
 
 input_cols = ['POSTED_SPEED_LIMIT', 'WEATHER_CONDITION', 'LIGHTING_CONDITION',
        'TRAFFICWAY_TYPE', 'ALIGNMENT',
@@ -20,11 +22,9 @@ input_cols = ['POSTED_SPEED_LIMIT', 'WEATHER_CONDITION', 'LIGHTING_CONDITION',
        'CRASH_MONTH', 'MANEUVER', 'SEX', 'AGE']
 
 def custom_predict(new_sample):
-    new_df = pd.DataFrame([new_sample])
-    for col in input_cols:
-        new_df[col] = label_encoders[col].transform(new_df[col].astype(str))
+    new_df = pd.DataFrame(label_encoders.encode_row(new_sample, input_cols), columns=input_cols)
     prediction = model.predict(new_df)
-    crash_type = label_encoders['FIRST_CRASH_TYPE'].inverse_transform(prediction)[0]
+    crash_type = label_encoders.decode('FIRST_CRASH_TYPE', prediction)[0]
     return crash_type
 
 new_sample = {
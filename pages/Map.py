@@ -1,15 +1,50 @@
 import streamlit as st
-from utilities import load_large_html_map
-import streamlit.components.v1 as components
+from perf import debug_panel, span, start_rerun
+
+start_rerun()
 
 st.title("Crash Map")
 
-if 'map_html' not in st.session_state:
-    with st.spinner("Preloading interactive map..."):
-        st.session_state['map_html'] = load_large_html_map()
+# Imported once the title is on screen
+import pydeck as pdk
+from utilities import DEFAULT_FILTERS, load_shared_dataset
+from spatial import CHICAGO_CENTER, GRID_LEVELS, MAX_CELLS
+
+dataset = load_shared_dataset()
+dataset.attach()
+
+# Follow the filters chosen on the Home page
+start_date, end_date, weather_condition, severity = st.session_state.get('crash_filters', DEFAULT_FILTERS)
+st.caption(f"Crashes from {start_date} to {end_date} · Weather: {weather_condition} · Severity: {severity} "
+           f"(change these on the Home page)")
+
+level = st.select_slider("Map Detail", options=list(GRID_LEVELS), value=12,
+                         format_func=lambda l: f"{GRID_LEVELS[l] * 111_000:,.0f} m cells")
+
+rows = dataset.filter_engine.rows(start_date, end_date, weather_condition, severity)
+cells = dataset.spatial_grid.aggregate(rows, level)
+if len(cells) == MAX_CELLS:
+    st.caption(f"Showing the {MAX_CELLS:,} busiest cells; pick a coarser detail to see every hotspot.")
+
+radius = GRID_LEVELS[level] * 111_000 / 2
+layer = pdk.Layer(
+    "ColumnLayer",
+    data=cells,
+    get_position=["longitude", "latitude"],
+    get_elevation="count",
+    elevation_scale=20 * radius / max(cells['count'].max() if len(cells) else 1, 1),
+    radius=radius,
+    get_fill_color="[247, 37 + 180 * (1 - injury_rate), 133, 200]",
+    pickable=True,
+    extruded=True,
+)
+deck = pdk.Deck(
+    layers=[layer],
+    initial_view_state=pdk.ViewState(latitude=CHICAGO_CENTER[0], longitude=CHICAGO_CENTER[1],
+                                     zoom=level - 0.5, pitch=40),
+    tooltip={"text": "{count} crashes\n{injuries} injuries"},
+)
+with span('figure.map'):
+    st.pydeck_chart(deck)
 
-# Render the map
-if 'map_html' in st.session_state:
-    components.html(st.session_state['map_html'], height=700)
-else:
-    st.info("Map is still loading. Please wait...")
\ No newline at end of file
+debug_panel()
@@ -1,13 +1,25 @@
 import streamlit as st
-import joblib
-import pandas as pd
+from perf import debug_panel, start_rerun
 
-# Load model and encoders
-model = joblib.load('./models/random_forest/RFclassifier.joblib')
-label_encoders = joblib.load('./models/random_forest/RF_encoders.joblib')
+start_rerun()
 
 st.title('Crash Type Predictor')
 
+# Imported once the title is on screen
+import pandas as pd
+import time
+from batch_predict import PREDICTION_COL
+import model_client
+from encoders import fallback_columns
+from model_compare import available_models, timing_stats
+from figures import paginated_dataframe
+from model_registry import registry
+from prediction_cache import prediction_cache
+
+# Encoders come from the process-wide registry; single predictions go to the
+# model server when one is running
+label_encoders = registry.get('random_forest', 'encoders')
+
 # Input widgets
 input_data = {}
 
@@ -43,21 +55,80 @@ for col in input_cols:
         index=index
     )
 
+compare_models = st.checkbox("Compare all models", help=", ".join(available_models()))
+
 # Prediction logic
 if st.button('Predict Crash Type'):
-    # Encode inputs
-    encoded_input = {}
-    for col in input_cols:
-        le = label_encoders[col]
-        encoded_value = le.transform([input_data[col]])[0]
-        encoded_input[col] = encoded_value
-
-    # Create DataFrame and predict
-    input_df = pd.DataFrame([encoded_input])
-    prediction = model.predict(input_df)
-
-    # Decode prediction
-    target_encoder = label_encoders['FIRST_CRASH_TYPE']
-    predicted_crash_type = target_encoder.inverse_transform(prediction)[0]
-
-    st.subheader(f"Predicted Crash Type: {predicted_crash_type}")
+    if not compare_models:
+        predicted_crash_type = model_client.predict('random_forest', [input_data])[0]
+
+        st.subheader(f"Predicted Crash Type: {predicted_crash_type}")
+    else:
+        results, seconds = model_client.compare(input_data)
+        columns = st.columns(len(results))
+        for column, result in zip(columns, results):
+            with column:
+                st.markdown(f"**{result['model']}**")
+                if result['prediction'] is None:
+                    st.error(result['error'])
+                else:
+                    st.metric("Predicted Crash Type", result['prediction'], f"{result['seconds'] * 1e3:.1f} ms",
+                              delta_color='off')
+        model_seconds = [r['seconds'] for r in results if r['seconds'] is not None]
+        st.caption(f"Scored in {seconds * 1e3:.1f} ms total; slowest model {max(model_seconds, default=0) * 1e3:.1f} ms, "
+                   f"sum over models {sum(model_seconds) * 1e3:.1f} ms")
+        probabilities = {r['model']: r['probabilities'] for r in results if r['probabilities'] is not None}
+        if probabilities:
+            st.markdown("**Class probabilities**")
+            st.dataframe(pd.DataFrame(probabilities).style.format('{:.3f}'))
+
+# Batch scoring
+st.markdown("---")
+st.subheader("Score a CSV of Crash Reports")
+uploaded = st.file_uploader(f"Upload a CSV with the columns: {', '.join(input_cols)}", type='csv')
+# Only columns with an UNKNOWN class can fall back to it; an unseen value in
+# any other column still rejects the file
+unknown_columns = fallback_columns(label_encoders.label_encoders, 'UNKNOWN')
+score_unknown = bool(unknown_columns) and st.checkbox(
+    f"Score values the model has never seen as UNKNOWN in {', '.join(unknown_columns)}",
+    help="Otherwise one unseen category rejects the whole file. Unseen values in the other columns always do.")
+if uploaded is not None:
+    # Scored once per upload and model version: paging through the table
+    # reruns the script, and the stored result is shown again
+    batch_key = (uploaded.file_id, registry.version('random_forest'), score_unknown)
+    scored = st.session_state.get('model.batch_scored')
+    if scored is None or scored['key'] != batch_key:
+        batch_df = pd.read_csv(uploaded, dtype=str)
+        start = time.perf_counter()
+        try:
+            # On the model server when one is running, like single predictions
+            batch_df[PREDICTION_COL] = model_client.predict_frame('random_forest', batch_df,
+                                                                  unknown='UNKNOWN' if score_unknown else None)
+        except ValueError as e:
+            scored = {'key': batch_key, 'error': str(e)}
+        else:
+            scored = {'key': batch_key, 'error': None, 'df': batch_df, 'seconds': time.perf_counter() - start,
+                      'csv': batch_df.to_csv(index=False)}
+        st.session_state['model.batch_scored'] = scored
+    if scored['error'] is not None:
+        st.error(scored['error'])
+    else:
+        batch_df, seconds = scored['df'], scored['seconds']
+        st.caption(f"Scored {len(batch_df):,} rows in {seconds:.2f}s ({len(batch_df) / max(seconds, 1e-9):,.0f} rows/sec)")
+        paginated_dataframe(batch_df, 'model.batch_table')
+        st.download_button("Download Predictions", scored['csv'], file_name='predictions.csv', mime='text/csv')
+
+with st.expander("Model Registry"):
+    st.dataframe(pd.DataFrame(registry.stats()))
+    comparison_timings = timing_stats()
+    if comparison_timings:
+        st.caption("Comparison mode latency per model")
+        st.dataframe(pd.DataFrame(comparison_timings))
+    st.caption("Prediction cache")
+    st.dataframe(pd.DataFrame([prediction_cache.stats()]))
+    server_stats = model_client.server_stats()
+    if server_stats is not None:
+        st.caption("Model server")
+        st.dataframe(pd.DataFrame(server_stats))
+
+debug_panel()
@@ -1,13 +1,7 @@
 import streamlit as st
-import pandas as pd
-import joblib
-import time 
-import numpy as np
+from perf import debug_panel, span, start_rerun
 
-# Load trained model and encoders
-model = joblib.load('./models/riskModel/model.pkl')
-encoders = joblib.load('./models/riskModel/encoders.pkl')
-target_encoder = joblib.load('./models/riskModel/target_encoder.pkl')
+start_rerun()
 
 st.markdown("""
     <style>
@@ -24,6 +18,16 @@ Predict the **risk level** of a traffic accident based on real-time crash data.
 Enter the conditions below to assess the likelihood of **Low**, **Medium**, or **High** risk.
 """)
 
+# Imported once the title is on screen
+import numpy as np
+import model_client
+from model_registry import RISK_FEATURES as feature_names, registry
+from spatial import CHICAGO_BOUNDS, CHICAGO_CENTER
+
+# Encoders come from the process-wide registry; predictions go to the model
+# server when one is running
+encoders = registry.get('riskModel', 'encoders')
+
 # --- User Inputs ---
 weather = st.selectbox("🌦️ Weather Condition", encoders['WEATHER_CONDITION'].classes_)
 lighting = st.selectbox("💡 Lighting Condition", encoders['LIGHTING_CONDITION'].classes_)
@@ -34,23 +38,28 @@ num_units = st.slider("🚘 Number of Units Involved", 1, 10, 2)
 crash_hour = st.slider("🕒 Crash Hour (0-23)", 0, 23, 12)
 crash_type = st.selectbox("🔄 First Crash Type", encoders['FIRST_CRASH_TYPE'].classes_)
 
+# The model has no location input; crash history around a point is looked up
+# in the spatial index instead (the crash data is only loaded when asked for)
+use_location = st.checkbox("📍 Add crash history around a location")
+if use_location:
+    south, west, north, east = CHICAGO_BOUNDS
+    col_lat, col_lon, col_radius = st.columns(3)
+    latitude = col_lat.number_input("Latitude", south, north, CHICAGO_CENTER[0], step=0.001, format="%.4f")
+    longitude = col_lon.number_input("Longitude", west, east, CHICAGO_CENTER[1], step=0.001, format="%.4f")
+    radius = col_radius.select_slider("Radius (m)", [100, 250, 500, 1000, 2000], value=500)
+
 if st.button("🔍 Predict Risk Level"):
     with st.spinner("Analyzing accident risk..."):
-        time.sleep(1.5)  # Simulate processing
-
-    input_data = pd.DataFrame([{ 
-        'POSTED_SPEED_LIMIT': speed_limit,
-        'WEATHER_CONDITION': encoders['WEATHER_CONDITION'].transform([weather])[0],
-        'LIGHTING_CONDITION': encoders['LIGHTING_CONDITION'].transform([lighting])[0],
-        'ROADWAY_SURFACE_COND': encoders['ROADWAY_SURFACE_COND'].transform([road_surface])[0],
-        'DAMAGE_VALUE': damage_value,
-        'NUM_UNITS': num_units,
-        'CRASH_HOUR': crash_hour,
-        'FIRST_CRASH_TYPE': encoders['FIRST_CRASH_TYPE'].transform([crash_type])[0]
-    }])
-
-    prediction = model.predict(input_data)[0]
-    risk_label = target_encoder.inverse_transform([prediction])[0]
+        risk_label = model_client.predict('riskModel', [{
+            'POSTED_SPEED_LIMIT': speed_limit,
+            'WEATHER_CONDITION': weather,
+            'LIGHTING_CONDITION': lighting,
+            'ROADWAY_SURFACE_COND': road_surface,
+            'DAMAGE_VALUE': damage_value,
+            'NUM_UNITS': num_units,
+            'CRASH_HOUR': crash_hour,
+            'FIRST_CRASH_TYPE': crash_type
+        }])[0]
 
     # Risk messages
     if risk_label == "High":
@@ -62,10 +71,31 @@ if st.button("🔍 Predict Risk Level"):
 
     st.markdown(f"### 🧠 Predicted Risk Level: **{risk_label.upper()}**")
 
+    if use_location:
+        # The data modules are only imported when a location is asked for
+        from utilities import load_shared_dataset
+        dataset = load_shared_dataset()
+        crashes = dataset.attach()
+        with span('spatial.location'):
+            index = dataset.spatial_index
+            local = index.injury_rate(latitude, longitude, radius)
+            rows, distances = index.nearest(latitude, longitude, 10)
+        citywide = dataset.mean_injuries
+
+        st.markdown("---")
+        st.subheader(f"📍 Crash History Within {radius:,} m")
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Crashes", f"{local['crashes']:,}")
+        if local['crashes']:
+            col2.metric("Injuries per Crash", f"{local['injury_rate']:.2f}",
+                        f"{local['injury_rate'] - citywide:+.2f} vs citywide", delta_color='inverse')
+        col3.metric("Crashes per km²", f"{local['crashes_per_km2']:,.0f}")
+        st.markdown("**Nearest crashes**")
+        nearest = crashes.iloc[rows][['CRASH_DATE', 'FIRST_CRASH_TYPE', 'WEATHER_CONDITION', 'INJURIES_TOTAL']]
+        st.dataframe(nearest.assign(DISTANCE_M=distances.round()), hide_index=True)
+
     # Feature Importance (manual approximation)
-    feature_names = ['POSTED_SPEED_LIMIT', 'WEATHER_CONDITION', 'LIGHTING_CONDITION', 'ROADWAY_SURFACE_COND',
-                    'DAMAGE_VALUE', 'NUM_UNITS', 'CRASH_HOUR', 'FIRST_CRASH_TYPE']
-    importances = model.feature_importances_
+    importances = model_client.info('riskModel')['feature_importances']
     top_features = sorted(zip(feature_names, importances), key=lambda x: x[1], reverse=True)[:3]
 
     # Driving tips
@@ -111,6 +141,11 @@ if st.button("🔍 Predict Risk Level"):
     if "REAR" in crash_type.upper():
         suggestions.append("🚘 Consider campaigns or signage against tailgating in this zone — frequent rear-end crashes detected.")
 
+    # LOCATION history
+    if use_location and local['crashes'] and local['injury_rate'] > 1.5 * citywide:
+        suggestions.append(f"📍 Crashes within {radius:,} m of this location injure {local['injury_rate']:.2f} people on "
+                           f"average, well above the citywide {citywide:.2f}; review this area for safety improvements.")
+
     # Feature-based explanation
     st.markdown("### 🔍 Model Insight:")
     top_feat_text = ", ".join([f"`{name}`" for name, _ in top_features])
@@ -122,3 +157,5 @@ if st.button("🔍 Predict Risk Level"):
             st.write(s)
     else:
         st.success("✅ No critical policy actions needed for this scenario. Conditions appear within low-risk thresholds.")
+
+debug_panel()
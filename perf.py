@@ -0,0 +1,191 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Spans are recorded only with CRASH_PERF=1; otherwise span() hands back a
+# shared no-op context manager and costs one attribute lookup and a call
+ENABLED = os.environ.get('CRASH_PERF', '0') == '1'
+EXPORT_DIR = os.environ.get('CRASH_PERF_EXPORT_DIR')
+EXPORT_SECONDS = float(os.environ.get('CRASH_PERF_EXPORT_SECONDS', '30'))
+# Histogram bucket upper bounds in seconds, Prometheus style
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WINDOW = 1000
+
+
+class SpanStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.recent = deque(maxlen=WINDOW)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.recent.append(seconds)
+
+    def summary(self):
+        import numpy as np
+        recent = np.array(self.recent)
+        p50, p90, p99 = np.percentile(recent, [50, 90, 99]) if len(recent) else (None, None, None)
+        return {'count': self.count, 'total_seconds': self.total, 'p50': p50, 'p90': p90, 'p99': p99}
+
+
+class PerfRecorder:
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._rerun = threading.local()
+        self._exporter = None
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = SpanStats()
+            stats.add(seconds)
+        spans = getattr(self._rerun, 'spans', None)
+        if spans is not None:
+            spans.append((name, seconds))
+        if EXPORT_DIR and self._exporter is None:
+            self._start_exporter()
+
+    def record_payload(self, name, nbytes):
+        payloads = getattr(self._rerun, 'payloads', None)
+        if payloads is not None:
+            payloads.append((name, nbytes))
+
+    def start_rerun(self):
+        # Spans and payloads recorded on this script thread from here on make
+        # up the rerun breakdown
+        self._rerun.spans = []
+        self._rerun.payloads = []
+        self._rerun.started = time.perf_counter()
+
+    def rerun_spans(self):
+        spans = getattr(self._rerun, 'spans', None) or []
+        started = getattr(self._rerun, 'started', None)
+        return spans, time.perf_counter() - started if started is not None else None
+
+    def rerun_payloads(self):
+        return getattr(self._rerun, 'payloads', None) or []
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.summary() for name, stats in sorted(self._stats.items())}
+
+    def prometheus(self):
+        lines = ['# TYPE crash_span_seconds histogram']
+        with self._lock:
+            for name, stats in sorted(self._stats.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), stats.buckets):
+                    cumulative += count
+                    lines.append(f'crash_span_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'crash_span_seconds_sum{{span="{name}"}} {stats.total}')
+                lines.append(f'crash_span_seconds_count{{span="{name}"}} {stats.count}')
+        return '\n'.join(lines) + '\n'
+
+    def export(self, out_dir=EXPORT_DIR):
+        # Written beside each other and swapped in, so a scraper never reads half a file
+        os.makedirs(out_dir, exist_ok=True)
+        for name, text in [('crash_perf.json', json.dumps(self.snapshot(), indent=2)),
+                           ('crash_perf.prom', self.prometheus())]:
+            path = os.path.join(out_dir, name)
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(path + '.tmp', path)
+
+    def _start_exporter(self):
+        with self._lock:
+            if self._exporter is not None:
+                return
+
+            def run():
+                while True:
+                    time.sleep(EXPORT_SECONDS)
+                    self.export()
+
+            self._exporter = threading.Thread(target=run, name='perf-export', daemon=True)
+            self._exporter.start()
+
+
+recorder = PerfRecorder()
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.record(name, time.perf_counter() - start)
+
+
+def span(name):
+    return _span(name) if ENABLED else _NO_SPAN
+
+
+def timed(name):
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_rerun():
+    if ENABLED:
+        recorder.start_rerun()
+
+
+def record_payload(name, nbytes):
+    # Bytes of a figure spec or table page this rerun sends to the browser
+    if ENABLED:
+        recorder.record_payload(name, nbytes)
+
+
+def debug_panel():
+    # Sidebar breakdown of this rerun plus rolling percentiles per span
+    if not ENABLED:
+        return
+    import pandas as pd
+    import streamlit as st
+    spans, seconds = recorder.rerun_spans()
+    payloads = recorder.rerun_payloads()
+    payload_bytes = sum(nbytes for _, nbytes in payloads)
+    if payloads:
+        print(f"Rerun payload: {payload_bytes / 1024:,.1f} KB in {len(payloads)} figures and tables")
+    with st.sidebar.expander("Performance"):
+        if seconds is not None:
+            st.caption(f"This rerun: {seconds * 1e3:,.1f} ms, {payload_bytes / 1024:,.1f} KB of figures and tables")
+        if payloads:
+            st.dataframe(pd.DataFrame([{'payload': name, 'KB': n / 1024} for name, n in payloads]), hide_index=True)
+        if spans:
+            st.dataframe(pd.DataFrame([{'span': name, 'ms': s * 1e3} for name, s in spans]), hide_index=True)
+        summary = pd.DataFrame.from_dict(recorder.snapshot(), orient='index')
+        if not summary.empty:
+            st.caption("Rolling percentiles (s)")
+            st.dataframe(summary)
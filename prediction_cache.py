@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from model_registry import registry
+
+MAX_ENTRIES = int(os.environ.get('CRASH_PREDICTION_CACHE_SIZE', '10000'))
+TTL_SECONDS = float(os.environ.get('CRASH_PREDICTION_CACHE_TTL', '3600'))
+
+_MISSING = object()
+
+
+class PredictionCache:
+    # Process-wide LRU of predictions shared by every session. Keys carry the
+    # model name, its artifact versions and the encoded feature tuple, so a
+    # retrained model never serves stale entries; those simply age out.
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return _MISSING
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+prediction_cache = PredictionCache()
+
+
+def cached_predict(name, records, encoders, columns, predict, cache=prediction_cache):
+    # predict(records) -> labels is only called for the records not cached
+    version = (name,) + tuple(registry.version(name, artifact) for artifact in registry.artifacts(name))
+    keys = [version + tuple(encoders.encode_row(record, columns)[0].tolist()) for record in records]
+    labels = [cache.get(key) for key in keys]
+    missing = [i for i, label in enumerate(labels) if label is _MISSING]
+    if missing:
+        for i, label in zip(missing, predict([records[i] for i in missing])):
+            cache.put(keys[i], label)
+            labels[i] = label
+    return labels
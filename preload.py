@@ -0,0 +1,69 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_WORKERS = int(os.environ.get('CRASH_PRELOAD_WORKERS', '4'))
+
+
+class _Task:
+    def __init__(self, future):
+        self.future = future
+        self.started = None
+        self.finished = None
+
+
+class PreloadScheduler:
+    # Process-wide warm-up of shared resources on a bounded worker pool. Each
+    # resource name runs at most once per process unless it failed, in which
+    # case the next submit runs it again; sessions poll or wait on the same
+    # future instead of starting their own loads.
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='preload')
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name, fn, *args, **kwargs):
+        with self._lock:
+            existing = self._tasks.get(name)
+            if existing is not None and not (existing.future.done() and existing.future.exception() is not None):
+                return existing.future
+
+            def run():
+                task.started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    task.finished = time.perf_counter()
+
+            task = _Task(None)
+            task.future = self._executor.submit(run)
+            self._tasks[name] = task
+            return task.future
+
+    def ready(self, name):
+        task = self._tasks.get(name)
+        return task is not None and task.future.done() and task.future.exception() is None
+
+    def wait(self, name, timeout=None):
+        return self._tasks[name].future.result(timeout)
+
+    def status(self):
+        rows = []
+        for name, task in list(self._tasks.items()):
+            future = task.future
+            if future.done():
+                state = 'failed' if future.exception() is not None else 'done'
+            else:
+                state = 'running' if task.started is not None else 'queued'
+            end = task.finished if task.finished is not None else time.perf_counter()
+            rows.append({
+                'resource': name,
+                'state': state,
+                'seconds': end - task.started if task.started is not None else None,
+                'error': repr(future.exception()) if state == 'failed' else None,
+            })
+        return rows
+
+
+scheduler = PreloadScheduler()
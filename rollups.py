@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+from perf import timed
+
+SEVERITY_CLASSES = {'Minor': 1, 'Moderate': 2, 'Severe': 3}
+
+# Every rollup table is keyed by the Home page filters (crash day, weather,
+# severity class) plus at most one chart dimension, which keeps each table
+# bounded by days x categories rather than by the number of crashes.
+# MIDNIGHT marks crashes at exactly 00:00, the only ones filter_data keeps
+# on the end date.
+FILTER_KEYS = ['DAY', 'MIDNIGHT', 'WEATHER_CONDITION', 'SEVERITY']
+ROAD_KEYS = ['TRAFFICWAY_TYPE', 'ROADWAY_SURFACE_COND', 'ROAD_DEFECT']
+ROLLUP_DIMENSIONS = {
+    'base': ['CRASH_MONTH'],
+    'hour': ['CRASH_HOUR'],
+    'lighting': ['LIGHTING_CONDITION'],
+    'damage': ['DAMAGE_CATEGORY'],
+}
+ROLLUP_TABLES = list(ROLLUP_DIMENSIONS) + ['roads']
+
+
+def severity_classes(injuries):
+    values = injuries.to_numpy(dtype='float64', na_value=np.nan)
+    codes = np.zeros(len(values), dtype=np.int8)
+    codes[values == 0] = SEVERITY_CLASSES['Minor']
+    codes[(values > 0) & (values <= 3)] = SEVERITY_CLASSES['Moderate']
+    codes[values > 3] = SEVERITY_CLASSES['Severe']
+    return codes
+
+
+@timed('aggregate.rollup_cube')
+def build_rollup_cube(df):
+    dates = df['CRASH_DATE']
+    days = dates.dt.normalize()
+    frame = pd.DataFrame({
+        'DAY': days,
+        'MIDNIGHT': (dates == days).to_numpy(),
+        'WEATHER_CONDITION': df['WEATHER_CONDITION'],
+        'SEVERITY': severity_classes(df['INJURIES_TOTAL']),
+        'CRASH_MONTH': df['CRASH_MONTH'],
+        'CRASH_HOUR': df['CRASH_HOUR'],
+        'LIGHTING_CONDITION': df['LIGHTING_CONDITION'],
+        'DAMAGE_CATEGORY': df['DAMAGE_CATEGORY'],
+        'INJURIES_TOTAL': df['INJURIES_TOTAL'].astype('float64'),
+        'DAMAGE_VALUE': df['DAMAGE_VALUE'].astype('int64'),
+        'POSTED_SPEED_LIMIT': df['POSTED_SPEED_LIMIT'].astype('float64'),
+    })
+    # Rows without a crash date can never pass the date filter
+    frame = frame[frame['DAY'].notna()]
+
+    cube = {}
+    for name, dims in ROLLUP_DIMENSIONS.items():
+        grouped = frame.groupby(FILTER_KEYS + dims, observed=True, dropna=False)
+        cube[name] = grouped.agg(
+            count=('DAMAGE_VALUE', 'size'),
+            injuries=('INJURIES_TOTAL', 'sum'),
+            damage=('DAMAGE_VALUE', 'sum'),
+            speed_sum=('POSTED_SPEED_LIMIT', 'sum'),
+            speed_count=('POSTED_SPEED_LIMIT', 'count'),
+        ).reset_index()
+    cube['roads'] = build_road_aggregates(df)
+    return cube
+
+
+def build_road_aggregates(df):
+    # One row per (trafficway, surface, defect) with the non-null injury count
+    # and injury sum, so the Roads page never groups raw rows
+    injuries = df['INJURIES_TOTAL'].astype('float64')
+    grouped = injuries.groupby([df[col] for col in ROAD_KEYS], observed=True)
+    table = grouped.agg(['count', 'sum']).reset_index()
+    return table.rename(columns={'sum': 'injuries'})
+
+
+@timed('aggregate.road_summary')
+def road_summary(table, trafficway=None, surface=None, defect=None):
+    # Same frame as filtering the raw rows with isin and running
+    # groupby(ROAD_KEYS)['INJURIES_TOTAL'].agg(['count', 'mean'])
+    mask = pd.Series(True, index=table.index)
+    for col, selected in zip(ROAD_KEYS, [trafficway, surface, defect]):
+        if selected:
+            mask &= table[col].isin(selected)
+    table = table[mask]
+    counts = table['count']
+    # INJURIES_TOTAL is float32 (crash_store.CRASH_SCHEMA) and a groupby mean keeps that dtype
+    means = (table['injuries'] / counts.where(counts > 0)).astype('float32')
+    return pd.DataFrame({
+        **{col: table[col] for col in ROAD_KEYS},
+        'Crash Count': counts,
+        'Avg Injuries': means,
+    }).reset_index(drop=True)
+
+
+def combine_rollups(cubes):
+    # Cubes built from separate chunks of the data; slices are always summed,
+    # so cells repeated across chunks need no re-aggregation. Categories
+    # differ between chunks and are restored after the concat.
+    combined = {}
+    for name in ROLLUP_DIMENSIONS:
+        table = pd.concat([cube[name] for cube in cubes], ignore_index=True)
+        for col in ['WEATHER_CONDITION', 'LIGHTING_CONDITION']:
+            if col in table.columns:
+                table[col] = table[col].astype('category')
+        combined[name] = table
+    # The Roads page shows road rows one-to-one, so those are re-aggregated
+    roads = pd.concat([cube['roads'] for cube in cubes], ignore_index=True)
+    roads = roads.groupby(ROAD_KEYS, observed=True)[['count', 'injuries']].sum().reset_index()
+    for col in ROAD_KEYS:
+        roads[col] = roads[col].astype('category')
+    combined['roads'] = roads
+    return combined
+
+
+@timed('aggregate.slice_rollup')
+def slice_rollup(table, start_date, end_date, weather, severity):
+    start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    day = table['DAY']
+    mask = (day >= start) & ((day < end) | ((day == end) & table['MIDNIGHT']))
+    if weather != 'All':
+        mask &= table['WEATHER_CONDITION'] == weather
+    if severity in SEVERITY_CLASSES:
+        mask &= table['SEVERITY'] == SEVERITY_CLASSES[severity]
+    return table[mask]
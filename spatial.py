@@ -0,0 +1,253 @@
+import numpy as np
+import pandas as pd
+
+from perf import timed
+
+# Lat/lon box around Chicago; crashes outside it (including the 0,0
+# placeholders in the export) are left off the map
+CHICAGO_BOUNDS = (41.60, -87.95, 42.05, -87.50)
+CHICAGO_CENTER = (41.84, -87.68)
+
+# Hierarchical grid: map zoom level -> cell size in degrees, halving per level
+GRID_LEVELS = {10: 0.02, 11: 0.01, 12: 0.005, 13: 0.0025, 14: 0.00125}
+MAX_CELLS = 5000
+
+
+class SpatialGrid:
+    # Per-row cell codes for every grid level, computed once, so a filtered
+    # selection is binned with a bincount over its rows. Whatever the number
+    # of matching crashes, at most MAX_CELLS aggregated cells are returned.
+    def __init__(self, latitude, longitude, injuries, bounds=CHICAGO_BOUNDS, levels=GRID_LEVELS):
+        lat = np.asarray(latitude, dtype='float64')
+        lon = np.asarray(longitude, dtype='float64')
+        self._set_geometry(bounds, levels)
+        self._injuries = np.nan_to_num(np.asarray(injuries, dtype='float64'))
+        south, west, north, east = bounds
+        valid = (lat >= south) & (lat < north) & (lon >= west) & (lon < east)
+
+        self._codes = {}
+        for level, size in levels.items():
+            n_cols = self._shape[level][1]
+            codes = np.full(len(lat), -1, dtype=np.int32)
+            codes[valid] = ((lat[valid] - south) // size).astype(np.int32) * n_cols + \
+                ((lon[valid] - west) // size).astype(np.int32)
+            self._codes[level] = codes
+
+    def _set_geometry(self, bounds, levels):
+        self.bounds = bounds
+        self.levels = levels
+        south, west, north, east = bounds
+        self._shape = {level: (int(np.ceil((north - south) / size)), int(np.ceil((east - west) / size)))
+                       for level, size in levels.items()}
+
+    def arrays(self):
+        # The per-row arrays, so a snapshot can store the grid with its frame
+        return {'injuries': self._injuries, **{f'codes_{level}': codes for level, codes in self._codes.items()}}
+
+    @classmethod
+    def from_arrays(cls, arrays, bounds=CHICAGO_BOUNDS, levels=GRID_LEVELS):
+        # The grid arrays() came from, without recomputing the cell codes.
+        # Raises KeyError when they were saved for other levels.
+        grid = cls.__new__(cls)
+        grid._set_geometry(bounds, levels)
+        grid._injuries = arrays['injuries']
+        grid._codes = {level: arrays[f'codes_{level}'] for level in levels}
+        return grid
+
+    def _aggregate(self, level, codes, injuries):
+        keep = codes >= 0
+        codes, injuries = codes[keep], injuries[keep]
+        n_cells = self._shape[level][0] * self._shape[level][1]
+        counts = np.bincount(codes, minlength=n_cells)
+        injury_sums = np.bincount(codes, weights=injuries, minlength=n_cells)
+        cells = np.flatnonzero(counts)
+        return cells, counts[cells], injury_sums[cells]
+
+    @timed('aggregate.spatial_grid')
+    def aggregate(self, rows, level, max_cells=MAX_CELLS):
+        # rows: a slice or an index array into the frame the grid was built from
+        cells, counts, injuries = self._aggregate(level, self._codes[level][rows], self._injuries[rows])
+        if len(cells) > max_cells:
+            top = np.argpartition(counts, -max_cells)[-max_cells:]
+            cells, counts, injuries = cells[top], counts[top], injuries[top]
+
+        size = self.levels[level]
+        south, west, _, _ = self.bounds
+        n_cols = self._shape[level][1]
+        return pd.DataFrame({
+            'latitude': south + (cells // n_cols + 0.5) * size,
+            'longitude': west + (cells % n_cols + 0.5) * size,
+            'count': counts,
+            'injuries': injuries,
+            'injury_rate': injuries / counts,
+        })
+
+
+
+EARTH_RADIUS_M = 6_371_000
+INDEX_CELL_METERS = 250
+# Radii of the neighborhood density features, in meters
+DENSITY_RADII = (250, 500, 1000)
+# Query x crash distance pairs computed at once by density_features
+BATCH_PAIRS = 4_000_000
+
+
+def project(latitude, longitude, origin=CHICAGO_CENTER):
+    # Equirectangular projection to meters around origin; across the city the
+    # distance error stays far below the size of an intersection
+    lat0, lon0 = np.radians(origin)
+    y = (np.radians(np.asarray(latitude, dtype='float64')) - lat0) * EARTH_RADIUS_M
+    x = (np.radians(np.asarray(longitude, dtype='float64')) - lon0) * np.cos(lat0) * EARTH_RADIUS_M
+    return x, y
+
+
+def _ranges(starts, stops):
+    # Concatenation of arange(start, stop) for every pair, without a loop
+    lengths = stops - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+class SpatialIndex:
+    # Uniform grid over projected meters with the crashes sorted by cell, so
+    # every grid row of a query box is one contiguous slice and only crashes
+    # in nearby cells get a distance computed. Results are row positions in
+    # the frame the index was built from.
+    def __init__(self, latitude, longitude, injuries, bounds=CHICAGO_BOUNDS, cell_meters=INDEX_CELL_METERS):
+        lat = np.asarray(latitude, dtype='float64')
+        lon = np.asarray(longitude, dtype='float64')
+        self._set_geometry(bounds, cell_meters)
+        south, west, north, east = bounds
+        valid = np.flatnonzero((lat >= south) & (lat < north) & (lon >= west) & (lon < east))
+        x, y = project(lat[valid], lon[valid])
+
+        codes = self._row(y) * self.n_cols + self._col(x)
+        order = np.argsort(codes, kind='stable')
+        self.rows = valid[order]
+        self._x = x[order].astype('float32')
+        self._y = y[order].astype('float32')
+        self._injuries = np.nan_to_num(np.asarray(injuries, dtype='float64')[self.rows]).astype('float32')
+        self._starts = np.searchsorted(codes[order], np.arange(self.n_rows * self.n_cols + 1))
+
+    def _set_geometry(self, bounds, cell_meters):
+        south, west, north, east = bounds
+        self.x0, self.y0 = (float(v) for v in project(south, west))
+        self.x1, self.y1 = (float(v) for v in project(north, east))
+        self.cell = cell_meters
+        self.n_cols = int(np.ceil((self.x1 - self.x0) / cell_meters))
+        self.n_rows = int(np.ceil((self.y1 - self.y0) / cell_meters))
+
+    def arrays(self):
+        # The sorted crash arrays, so a snapshot can store the index with its frame
+        return {'rows': self.rows, 'x': self._x, 'y': self._y, 'injuries': self._injuries, 'starts': self._starts}
+
+    @classmethod
+    def from_arrays(cls, arrays, bounds=CHICAGO_BOUNDS, cell_meters=INDEX_CELL_METERS):
+        # The index arrays() came from, without sorting the crashes again.
+        # Raises ValueError when they were saved for another grid.
+        index = cls.__new__(cls)
+        index._set_geometry(bounds, cell_meters)
+        index.rows, index._x, index._y, index._injuries, index._starts = (
+            arrays[name] for name in ['rows', 'x', 'y', 'injuries', 'starts'])
+        if len(index._starts) != index.n_rows * index.n_cols + 1:
+            raise ValueError('spatial index arrays were saved for another grid')
+        return index
+
+    def _col(self, x):
+        return np.clip((x - self.x0) // self.cell, 0, self.n_cols - 1).astype(np.int64)
+
+    def _row(self, y):
+        return np.clip((y - self.y0) // self.cell, 0, self.n_rows - 1).astype(np.int64)
+
+    def _box(self, x_min, x_max, y_min, y_max):
+        # Positions, in cell order, of the crashes in every cell the box touches
+        # The first test is also false for NaN coordinates
+        if not (x_min <= x_max and y_min <= y_max) or \
+                x_max < self.x0 or x_min >= self.x1 or y_max < self.y0 or y_min >= self.y1:
+            return np.empty(0, dtype=np.intp)
+        col0, col1 = self._col(x_min), self._col(x_max)
+        first = np.arange(self._row(y_min), self._row(y_max) + 1) * self.n_cols
+        return _ranges(self._starts[first + col0], self._starts[first + col1 + 1])
+
+    def _distances(self, positions, x, y):
+        return np.hypot(self._x[positions] - x, self._y[positions] - y)
+
+    def within(self, latitude, longitude, radius_m, return_distance=False):
+        x, y = (float(v) for v in project(latitude, longitude))
+        positions = self._box(x - radius_m, x + radius_m, y - radius_m, y + radius_m)
+        distances = self._distances(positions, x, y)
+        keep = distances <= radius_m
+        rows = self.rows[positions[keep]]
+        return (rows, distances[keep]) if return_distance else rows
+
+    def nearest(self, latitude, longitude, k=10):
+        # Doubles the search box until the k-th closest crash in it is no
+        # farther than the box's half width, so nothing outside can be closer
+        x, y = (float(v) for v in project(latitude, longitude))
+        # A NaN box never covers the index, so the search would never stop
+        if not (np.isfinite(x) and np.isfinite(y)):
+            raise ValueError(f'nearest() needs a finite latitude and longitude, got {latitude}, {longitude}')
+        covers_all = max(abs(x - self.x0), abs(x - self.x1), abs(y - self.y0), abs(y - self.y1))
+        reach = self.cell
+        while True:
+            positions = self._box(x - reach, x + reach, y - reach, y + reach)
+            distances = self._distances(positions, x, y)
+            if (len(positions) >= k and np.partition(distances, k - 1)[k - 1] <= reach) or reach >= covers_all:
+                break
+            reach *= 2
+        top = np.argsort(distances, kind='stable')[:k]
+        return self.rows[positions[top]], distances[top]
+
+    def injury_rate(self, latitude, longitude, radius_m):
+        x, y = (float(v) for v in project(latitude, longitude))
+        positions = self._box(x - radius_m, x + radius_m, y - radius_m, y + radius_m)
+        positions = positions[self._distances(positions, x, y) <= radius_m]
+        crashes = len(positions)
+        injuries = float(self._injuries[positions].sum(dtype='float64'))
+        return {
+            'crashes': crashes,
+            'injuries': injuries,
+            'injury_rate': injuries / crashes if crashes else float('nan'),
+            'crashes_per_km2': crashes / (np.pi * radius_m ** 2 / 1e6),
+        }
+
+    def density_features(self, latitude, longitude, radii=DENSITY_RADII):
+        # Crash count, injury sum and injury rate within each radius of every
+        # point. Points are handled in blocks the size of the largest radius:
+        # one candidate set per block, distances for a chunk of points at once.
+        radii = sorted(radii)
+        reach = radii[-1]
+        x, y = project(latitude, longitude)
+        n_points = len(x)
+        counts = np.zeros((n_points, len(radii)), dtype=np.int64)
+        injuries = np.zeros((n_points, len(radii)), dtype='float64')
+
+        block = max(reach, self.cell)
+        located = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        keys = (np.floor((x[located] - self.x0) / block).astype(np.int64) << 32) + \
+            np.floor((y[located] - self.y0) / block).astype(np.int64)
+        order = np.argsort(keys, kind='stable')
+        for points in np.split(located[order], np.flatnonzero(np.diff(keys[order])) + 1):
+            if not len(points):
+                continue
+            px, py = x[points], y[points]
+            positions = self._box(px.min() - reach, px.max() + reach, py.min() - reach, py.max() + reach)
+            if not len(positions):
+                continue
+            cx, cy, weights = self._x[positions], self._y[positions], self._injuries[positions]
+            step = max(1, BATCH_PAIRS // len(positions))
+            for i in range(0, len(points), step):
+                chunk = points[i:i + step]
+                d2 = (x[chunk, None] - cx) ** 2 + (y[chunk, None] - cy) ** 2
+                for j, radius in enumerate(radii):
+                    inside = d2 <= radius ** 2
+                    counts[chunk, j] = inside.sum(axis=1)
+                    injuries[chunk, j] = inside.astype('float32') @ weights
+
+        features = {}
+        for j, radius in enumerate(radii):
+            features[f'crashes_{radius}m'] = counts[:, j]
+            features[f'injuries_{radius}m'] = injuries[:, j]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                features[f'injury_rate_{radius}m'] = injuries[:, j] / counts[:, j]
+        return pd.DataFrame(features)
@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PAGES = ['Home.py', 'pages/Roads.py', 'pages/Map.py', 'pages/Model.py', 'pages/Risk.py']
+MODULES = ['perf', 'preload', 'figures', 'rollups', 'spatial', 'crash_store', 'encoders', 'model_registry',
+           'batch_predict', 'model_client', 'model_compare', 'utilities']
+# Libraries a module should only load on the code path that needs them
+HEAVY = ['numpy', 'pandas', 'plotly', 'plotly.express', 'pydeck', 'pyarrow', 'joblib', 'sklearn', 'lightgbm',
+         'xgboost']
+IMPORT_MARKER = '--- profiled import ---'
+
+# Each measurement runs in a fresh interpreter, so nothing is already
+# imported. Streamlit itself is imported first and not counted: every page
+# pays for it before its first line runs.
+_IMPORT_SCRIPT = '''
+import importlib, json, sys, time
+import streamlit
+before = set(sys.modules)
+sys.stderr.write({marker!r} + "\\n")
+start = time.perf_counter()
+importlib.import_module({module!r})
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "modules": len(set(sys.modules) - before),
+    "heavy": [name for name in {heavy!r} if name in sys.modules and name not in before],
+}}))
+'''
+
+_PAGE_SCRIPT = '''
+import json, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+# First paint: the first st.title call, which every page makes before its
+# data-dependent widgets
+first_paint = []
+title = streamlit.title
+def timed_title(*args, **kwargs):
+    if not first_paint:
+        first_paint.append(time.perf_counter() - start)
+    return title(*args, **kwargs)
+streamlit.title = timed_title
+at = AppTest.from_file({page!r}, default_timeout={timeout!r})
+start = time.perf_counter()
+error = None
+try:
+    at.run()
+    if at.exception:
+        error = at.exception[0].message
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+print(json.dumps({{
+    "first_paint": first_paint[0] if first_paint else None,
+    "seconds": time.perf_counter() - start,
+    "heavy": [name for name in {heavy!r} if name in sys.modules and name not in before],
+    "error": error,
+}}))
+'''
+
+
+def _run(script, cwd, importtime=False):
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', script]
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join([ROOT, os.environ.get('PYTHONPATH', '')])}
+    result = subprocess.run(command, cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed')
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def _heaviest(importtime_log, top):
+    # Top-level packages by cumulative import time, from the -X importtime
+    # lines written after the marker
+    lines = importtime_log.split(IMPORT_MARKER, 1)[-1].splitlines()
+    packages = []
+    for line in lines:
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if cumulative.strip().isdigit() and not name[1:].startswith(' '):
+            packages.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(packages, reverse=True)[:top]
+
+
+def import_profile(module, cwd=ROOT, top=5):
+    profile, log = _run(_IMPORT_SCRIPT.format(module=module, heavy=HEAVY, marker=IMPORT_MARKER), cwd,
+                        importtime=True)
+    profile['heaviest'] = _heaviest(log, top)
+    return profile
+
+
+def page_profile(page, cwd=ROOT, timeout=600):
+    profile, _ = _run(_PAGE_SCRIPT.format(page=os.path.join(ROOT, page), timeout=timeout, heavy=HEAVY), cwd)
+    return profile
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report cold-process import and load times per module and page.')
+    parser.add_argument('--modules', nargs='*', default=MODULES)
+    parser.add_argument('--pages', nargs='*', default=PAGES)
+    parser.add_argument('--data-dir', default=ROOT, help='working directory holding the crash data')
+    parser.add_argument('--json', action='store_true', help='print the raw profiles as JSON')
+    args = parser.parse_args()
+
+    report = {'modules': {}, 'pages': {}}
+    for module in args.modules:
+        report['modules'][module] = profile = import_profile(module, args.data_dir)
+        if not args.json:
+            heaviest = ', '.join(f'{name} {seconds * 1e3:.0f}ms' for seconds, name in profile['heaviest'])
+            print(f"import {module:<16} {profile['seconds'] * 1e3:8.1f} ms  {profile['modules']:4d} modules  "
+                  f"heavy: {', '.join(profile['heavy']) or '-'}  ({heaviest})")
+    for page in args.pages:
+        report['pages'][page] = profile = page_profile(page, args.data_dir)
+        if not args.json:
+            first_paint = f"{profile['first_paint'] * 1e3:8.1f} ms" if profile['first_paint'] is not None else '       -   '
+            print(f"page {page:<18} first paint {first_paint}  full run {profile['seconds']:7.2f} s  "
+                  f"heavy: {', '.join(profile['heavy']) or '-'}"
+                  + (f"  error: {profile['error']}" if profile['error'] else ''))
+    if args.json:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import shutil
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import classification_report
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+import crash_store
+from model_registry import MODEL_DIR
+
+# Same features, label and model as the first cell of Risk_Analysis.ipynb,
+# which produced the artifacts the Risk page loads
+FEATURES = ['POSTED_SPEED_LIMIT', 'WEATHER_CONDITION', 'LIGHTING_CONDITION',
+            'ROADWAY_SURFACE_COND', 'DAMAGE_VALUE', 'NUM_UNITS', 'CRASH_HOUR',
+            'FIRST_CRASH_TYPE']
+CATEGORICAL = ['WEATHER_CONDITION', 'LIGHTING_CONDITION', 'ROADWAY_SURFACE_COND', 'FIRST_CRASH_TYPE']
+LABEL = 'RISK_LEVEL'
+REQUIRED = ['POSTED_SPEED_LIMIT', 'WEATHER_CONDITION', 'LIGHTING_CONDITION',
+            'ROADWAY_SURFACE_COND', 'DAMAGE', 'NUM_UNITS', 'CRASH_HOUR',
+            'FIRST_CRASH_TYPE', 'INJURIES_TOTAL']
+READ_COLUMNS = REQUIRED + ['CRASH_DATE']
+
+RISK_DIR = os.path.join(MODEL_DIR, 'riskModel')
+CHUNK_SIZE = 200_000
+# Most rows kept for training; memory stays at this many prepared rows plus
+# one chunk however large the crash history grows
+MAX_ROWS = 1_000_000
+SEED = 42
+
+
+def parse_damage(val):
+    # From Risk_Analysis.ipynb; differs from utilities.extract_damage_value
+    # ("$500 OR LESS" is 500 and anything unparsable is 1000)
+    if isinstance(val, str):
+        val = val.replace(',', '')
+        if 'OVER' in val:
+            return 2000
+        elif 'LESS' in val:
+            return 500
+        elif '-' in val:
+            parts = val.replace('$', '').split(' - ')
+            return (int(parts[0]) + int(parts[1])) / 2
+    return 1000
+
+
+def risk_damage_values(damage):
+    codes, uniques = pd.factorize(damage)
+    lookup = np.array([parse_damage(u) for u in uniques] + [parse_damage(None)], dtype=np.float64)
+    return lookup[codes]
+
+
+def risk_levels(injuries, damage_value):
+    # assign_risk from the notebook, over whole columns
+    return np.select([injuries >= 1, damage_value >= 1500], ['High', 'Medium'], 'Low')
+
+
+def iter_chunks(chunk_size=CHUNK_SIZE):
+    if crash_store.store_is_fresh():
+        generation = crash_store.store_generation()
+        for paths in crash_store.partition_years():
+            yield crash_store.read_partitions(paths, READ_COLUMNS, generation)
+    else:
+        for path in crash_store.CSV_FILES:
+            yield from pd.read_csv(path, usecols=lambda c: c in READ_COLUMNS, chunksize=chunk_size, low_memory=False)
+
+
+def prepare_chunk(chunk, sample=1.0, seed=42):
+    # Reduces a raw chunk to float32 numeric features, categorical string
+    # features and the label, so only the compact form stays in memory
+    if 'CRASH_HOUR' not in chunk.columns:
+        chunk['CRASH_HOUR'] = crash_store.parse_crash_date(chunk['CRASH_DATE']).dt.hour
+    chunk = chunk.dropna(subset=REQUIRED)
+    if sample < 1.0:
+        chunk = chunk.sample(frac=sample, random_state=seed)
+    damage_value = risk_damage_values(chunk['DAMAGE'])
+    prepared = pd.DataFrame({
+        'POSTED_SPEED_LIMIT': chunk['POSTED_SPEED_LIMIT'].to_numpy(dtype='float32'),
+        'DAMAGE_VALUE': damage_value.astype('float32'),
+        'NUM_UNITS': chunk['NUM_UNITS'].to_numpy(dtype='float32'),
+        'CRASH_HOUR': chunk['CRASH_HOUR'].to_numpy(dtype='float32'),
+        LABEL: pd.Categorical(risk_levels(chunk['INJURIES_TOTAL'].to_numpy(dtype='float64'), damage_value)),
+    })
+    for col in CATEGORICAL:
+        prepared[col] = pd.Categorical(chunk[col].astype(str).to_numpy())
+    return prepared
+
+
+def encode(prepared):
+    # LabelEncoder classes are the sorted unique values, so fitting on the
+    # categories gives the same encoders as fitting on every row
+    encoders = {}
+    X = pd.DataFrame(index=range(len(prepared[LABEL])))
+    for col in FEATURES:
+        values = prepared[col]
+        if col in CATEGORICAL:
+            le = LabelEncoder().fit(values.categories)
+            X[col] = le.transform(values.categories)[values.codes]
+            encoders[col] = le
+        else:
+            X[col] = values
+    target_encoder = LabelEncoder().fit(prepared[LABEL].categories)
+    y = target_encoder.transform(prepared[LABEL].categories)[prepared[LABEL].codes]
+    return X, y, encoders, target_encoder
+
+
+def _concat(kept, values):
+    return union_categoricals([kept, values]) if isinstance(kept, pd.Categorical) else np.concatenate([kept, values])
+
+
+def train(output_dir, n_jobs=-1, n_estimators=100, sample=1.0, chunk_size=CHUNK_SIZE, promote=False,
+          max_rows=MAX_ROWS):
+    timings = {}
+    start = time.perf_counter()
+
+    # Bottom-k sampling over the chunks: every row gets a uniform random key
+    # and the max_rows rows with the smallest keys are kept, a uniform sample
+    # of all rows read that is the same on every run
+    rng = np.random.default_rng(SEED)
+    kept, kept_keys = None, None
+    rows_read = 0
+    for chunk in iter_chunks(chunk_size):
+        rows_read += len(chunk)
+        prepared = prepare_chunk(chunk, sample)
+        del chunk
+        columns = {col: prepared[col].array if col in CATEGORICAL + [LABEL] else prepared[col].to_numpy()
+                   for col in FEATURES + [LABEL]}
+        keys = rng.random(len(prepared))
+        if kept is not None:
+            columns = {col: _concat(kept[col], values) for col, values in columns.items()}
+            keys = np.concatenate([kept_keys, keys])
+        if max_rows and len(keys) > max_rows:
+            keep = np.sort(np.argpartition(keys, max_rows)[:max_rows])
+            columns = {col: values[keep] for col, values in columns.items()}
+            keys = keys[keep]
+        kept, kept_keys = columns, keys
+    prepared = kept
+    del kept, kept_keys
+    timings['load_and_label'] = time.perf_counter() - start
+
+    stage = time.perf_counter()
+    X, y, encoders, target_encoder = encode(prepared)
+    del prepared
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    timings['encode_and_split'] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    clf = RandomForestClassifier(n_estimators=n_estimators, class_weight='balanced', random_state=42, n_jobs=n_jobs)
+    clf.fit(X_train, y_train)
+    timings['fit'] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    y_pred = clf.predict(X_test)
+    report = classification_report(y_test, y_pred, target_names=target_encoder.classes_, output_dict=True)
+    timings['evaluate'] = time.perf_counter() - stage
+
+    stage = time.perf_counter()
+    version = time.strftime('%Y%m%d-%H%M%S')
+    version_dir = os.path.join(output_dir, 'versions', version)
+    os.makedirs(version_dir)
+    joblib.dump(clf, os.path.join(version_dir, 'model.pkl'))
+    joblib.dump(encoders, os.path.join(version_dir, 'encoders.pkl'))
+    joblib.dump(target_encoder, os.path.join(version_dir, 'target_encoder.pkl'))
+    timings['save'] = time.perf_counter() - stage
+    timings['total'] = time.perf_counter() - start
+
+    metrics = {
+        'version': version,
+        'rows_read': rows_read,
+        'rows_train': len(X_train),
+        'rows_test': len(X_test),
+        'sample': sample,
+        'max_rows': max_rows,
+        'params': {'n_estimators': n_estimators, 'n_jobs': n_jobs, 'class_weight': 'balanced', 'random_state': 42},
+        'data_generation': crash_store.store_generation() if crash_store.store_is_fresh() else None,
+        'accuracy': report['accuracy'],
+        'report': report,
+        'feature_importances': dict(zip(FEATURES, clf.feature_importances_.tolist())),
+        'timings': {stage: round(seconds, 2) for stage, seconds in timings.items()},
+    }
+    with open(os.path.join(version_dir, 'metrics.json'), 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, indent=2)
+
+    if promote:
+        # The registry reloads the Risk page artifacts when their mtime changes
+        for name in ['model.pkl', 'encoders.pkl', 'target_encoder.pkl', 'metrics.json']:
+            shutil.copy2(os.path.join(version_dir, name), os.path.join(output_dir, name + '.tmp'))
+            os.replace(os.path.join(output_dir, name + '.tmp'), os.path.join(output_dir, name))
+    return version_dir, metrics
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the crash risk model from the crash data store.')
+    parser.add_argument('--output', default=RISK_DIR)
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--n-estimators', type=int, default=100)
+    parser.add_argument('--sample', type=float, default=1.0, help='fraction of rows kept from each chunk')
+    parser.add_argument('--max-rows', type=int, default=MAX_ROWS,
+                        help='train on a uniform sample of at most this many rows; 0 keeps every row')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--promote', action='store_true', help='also install the artifacts for the Risk page')
+    args = parser.parse_args()
+    version_dir, metrics = train(args.output, args.n_jobs, args.n_estimators, args.sample, args.chunk_size, args.promote,
+                                 args.max_rows)
+    print(f"Trained on {metrics['rows_train']:,} rows, accuracy {metrics['accuracy']:.3f}; artifacts in {version_dir}")
+    for stage, seconds in metrics['timings'].items():
+        print(f"  {stage}: {seconds}s")
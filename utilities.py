@@ -1,9 +1,38 @@
+import numpy as np
 import pandas as pd
 import re
 import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import os
+import threading
 import time
+from collections import OrderedDict
+import crash_store
+from crash_store import CRASH_SCHEMA
+import model_client
+from spatial import SpatialGrid, SpatialIndex
+from preload import scheduler
+from perf import span, timed
+from model_registry import PREWARM_MODELS, registry
+from rollups import ROLLUP_TABLES, SEVERITY_CLASSES, build_rollup_cube, combine_rollups, severity_classes
+
+# Initial Home page filters; other pages fall back to these until Home has run
+DEFAULT_FILTERS = (pd.to_datetime('2020-01-01').date(), pd.to_datetime('2025-01-01').date(), 'All', 'All')
+
+DAMAGE_BINS = [500, 1000, 1500]
+DAMAGE_CATEGORIES = ["$0 - $500", "$501 - $1,000", "$1,001 - $1,500", "Over $1,500"]
+
+# CRASH_DATE stays as read at load time; preprocess_crash_data parses it with the explicit format
+RAW_SCHEMA = {col: dtype for col, dtype in CRASH_SCHEMA.items() if col != 'CRASH_DATE'}
+DERIVED_SCHEMA = {
+    'DAMAGE_VALUE': 'int16',
+    'DAMAGE_CATEGORY': pd.CategoricalDtype(DAMAGE_CATEGORIES, ordered=True),
+    'CRASH_MONTH': 'int8',
+    'CRASH_HOUR': 'int8',
+}
+
 
-@st.cache_data
 def extract_damage_value(damage_str):
     if pd.isna(damage_str) or not isinstance(damage_str, str):
         return 0
@@ -20,7 +49,6 @@ def extract_damage_value(damage_str):
     return 0
 
 
-@st.cache_data
 def categorize_damage(value):
     if value <= 500:
         return "$0 - $500"
@@ -31,24 +59,461 @@ def categorize_damage(value):
     else:
         return "Over $1,500"
 
-@st.cache_data
-def preprocess_crash_data(df):
-    df['DAMAGE_VALUE'] = df['DAMAGE'].apply(extract_damage_value)
-    df['DAMAGE_CATEGORY'] = df['DAMAGE_VALUE'].apply(categorize_damage)
-    df['CRASH_DATE'] = pd.to_datetime(df['CRASH_DATE'], errors='coerce')
-    df['CRASH_MONTH'] = df['CRASH_DATE'].dt.month
-    df['CRASH_HOUR'] = pd.to_datetime(df['CRASH_DATE'], errors='coerce').dt.hour
+
+def _cast_column(col, dtype):
+    if isinstance(dtype, str) and dtype.startswith('int') and col.isna().any():
+        dtype = 'float32'
+    if str(col.dtype) == str(dtype):
+        return col
+    if str(dtype).startswith('datetime'):
+        return pd.to_datetime(col, errors='coerce')
+    return col.astype(dtype)
+
+
+def apply_schema(df, schema):
+    before = df.memory_usage(deep=True).sum()
+    for col, dtype in schema.items():
+        if col in df.columns:
+            df[col] = _cast_column(df[col], dtype)
+    after = df.memory_usage(deep=True).sum()
+    return before, after
+
+
+def report_memory(label, before, after):
+    print(f"{label}: {before / 2**20:,.1f} MB -> {after / 2**20:,.1f} MB")
+
+
+def damage_values(damage):
+    # DAMAGE only holds a handful of distinct strings: parse each one once and
+    # broadcast through the factorized codes (-1 for missing picks the trailing 0).
+    codes, uniques = pd.factorize(damage)
+    lookup = np.array([extract_damage_value(u) for u in uniques] + [0], dtype=np.int64)
+    return lookup[codes]
+
+
+def damage_categories(values):
+    codes = np.searchsorted(DAMAGE_BINS, values, side='left')
+    return pd.Categorical.from_codes(codes, dtype=DERIVED_SCHEMA['DAMAGE_CATEGORY'])
+
+
+@timed('preprocess')
+def preprocess_crash_data(df, report=True):
+    dates = df['CRASH_DATE']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = crash_store.parse_crash_date(dates)
+    damage = damage_values(df['DAMAGE'])
+    df['DAMAGE_VALUE'] = damage
+    df['DAMAGE_CATEGORY'] = damage_categories(damage)
+    df['CRASH_DATE'] = dates
+    df['CRASH_MONTH'] = dates.dt.month
+    df['CRASH_HOUR'] = dates.dt.hour
+    before, after = apply_schema(df, DERIVED_SCHEMA)
+    if report:
+        report_memory("preprocess_crash_data", before, after)
     return df
 
-@st.cache_data
+
+def read_crash_csv(path):
+    return pd.read_csv(path, usecols=lambda c: c in CRASH_SCHEMA, low_memory=False)
+
 def load_crash_data_with_progress():
     dfs = []
     progress = st.progress(0)
-    for i in range(13):
-        dfs.append(pd.read_csv(f'crash_data_{i+1}.csv'))
-        progress.progress((i+1)/13)
-    return pd.concat(dfs)
+    columns = list(CRASH_SCHEMA)
+    if crash_store.store_is_fresh():
+        years = crash_store.partition_years()
+        for i, paths in enumerate(years):
+            dfs.append(crash_store.read_partitions(paths, columns))
+            progress.progress((i+1)/len(years))
+    else:
+        # Store missing or stale: run `python crash_store.py` to rebuild it
+        files = crash_store.CSV_FILES
+        for i, path in enumerate(files):
+            dfs.append(read_crash_csv(path))
+            progress.progress((i+1)/len(files))
+    df = pd.concat(dfs, ignore_index=True)
+    report_memory("load_crash_data_with_progress", *apply_schema(df, RAW_SCHEMA))
+    return df
+
+class SharedDataset:
+    def __init__(self, df, rollups, derived=None):
+        self._df = df
+        self.rollups = rollups
+        # Row structures mapped from a published snapshot, by name
+        self._derived = derived or {}
+        self.filter_engine = self._mapped('filter_engine', lambda arrays: CrashFilterEngine.from_arrays(df, arrays)) \
+            or CrashFilterEngine(df)
+        self._spatial_grid = None
+        self._spatial_index = None
+        self._mean_injuries = None
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._grid_lock = threading.Lock()
+        self._index_lock = threading.Lock()
+
+    def attach(self):
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            with self._lock:
+                self._sessions.add(ctx.session_id)
+        # A shallow copy: a column a page assigns replaces it in the copy
+        # only, while the column arrays stay shared
+        return self._df.copy(deep=False)
+
+    @property
+    def session_count(self):
+        runtime = Runtime.instance() if Runtime.exists() else None
+        with self._lock:
+            if runtime is not None:
+                self._sessions = {s for s in self._sessions if runtime.is_active_session(s)}
+            return len(self._sessions)
+
+    def _mapped(self, name, from_arrays):
+        # None when the snapshot did not include the structure, or stored it
+        # in a layout this version no longer reads
+        arrays = self._derived.get(name)
+        if arrays is None:
+            return None
+        try:
+            return from_arrays(arrays)
+        except (KeyError, ValueError):
+            return None
+
+    def derived_arrays(self):
+        # Everything a replica mapping this dataset would otherwise rebuild
+        # from the rows; builds the spatial structures if no page has yet
+        return {
+            'filter_engine': self.filter_engine.arrays(),
+            'spatial_grid': self.spatial_grid.arrays(),
+            'spatial_index': self.spatial_index.arrays(),
+        }
+
+    def filter(self, start_date, end_date, weather, severity):
+        return self.filter_engine.filter(start_date, end_date, weather, severity)
+
+    @property
+    def spatial_grid(self):
+        # Built on first use by the Map page, then shared
+        with self._grid_lock:
+            if self._spatial_grid is None:
+                df = self._df
+                self._spatial_grid = self._mapped('spatial_grid', SpatialGrid.from_arrays) or \
+                    SpatialGrid(df['LATITUDE'], df['LONGITUDE'], df['INJURIES_TOTAL'])
+            return self._spatial_grid
+
+    @property
+    def spatial_index(self):
+        # Built on first use by the Risk page's location lookup, then shared
+        with self._index_lock:
+            if self._spatial_index is None:
+                df = self._df
+                self._spatial_index = self._mapped('spatial_index', SpatialIndex.from_arrays) or \
+                    SpatialIndex(df['LATITUDE'], df['LONGITUDE'], df['INJURIES_TOTAL'])
+            return self._spatial_index
+
+    @property
+    def mean_injuries(self):
+        # Citywide injuries per crash; a dataset covers one data generation,
+        # so this is computed once per generation rather than per request
+        if self._mean_injuries is None:
+            self._mean_injuries = float(self._df['INJURIES_TOTAL'].mean())
+        return self._mean_injuries
+
+    @property
+    def memory_usage(self):
+        return self._df.memory_usage(deep=True).sum()
+
+
+class ProgressiveDatasetLoader:
+    # Builds the SharedDataset on a preload worker, most recent partitions
+    # first. Until it is done, partial_rollups() covers everything read so far
+    # so pages can chart partial data; progress is measured in bytes read.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows_loaded = 0
+        self.bytes_loaded = 0
+        self.bytes_total = 0
+        self.first_chart_seconds = None
+        self.full_load_seconds = None
+        self.error = None
+        self.dataset = None
+        # Store data generation the dataset covers; None when read from the CSVs
+        self.generation = None
+        self._manifest_mtime = None
+        self._refresh_lock = threading.Lock()
+        self._parts = []
+        self._rollup_parts = []
+        self._rollups = None
+        self._rollups_complete = False
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def _sources(self):
+        columns = list(CRASH_SCHEMA)
+        if self.generation is not None:
+            # A year of partitions per read keeps the per-read overhead low
+            return [(sum(crash_store.partition_bytes(path) for path in paths),
+                     lambda paths=paths: crash_store.read_partitions(paths, columns, self.generation))
+                    for paths in crash_store.partition_years(newest_first=True)]
+        # Store missing or stale: run `python crash_store.py` to rebuild it
+        return [(os.path.getsize(path), lambda path=path: read_crash_csv(path))
+                for path in reversed(crash_store.CSV_FILES)]
+
+    def run(self):
+        try:
+            persisted = crash_store.store_is_fresh()
+            if persisted:
+                self._manifest_mtime = os.path.getmtime(os.path.join(crash_store.STORE_DIR, crash_store.MANIFEST))
+                self.generation = crash_store.store_generation()
+                # Another replica on this host may have published it already
+                if self._map_snapshot(self.generation):
+                    self.full_load_seconds = time.perf_counter() - self.started
+                    print(f"Mapped crash data generation {self.generation} in {self.full_load_seconds:.2f}s "
+                          f"({self.rows_loaded:,} rows)")
+                    return self.dataset
+            stored_rollups = crash_store.load_rollups(generation=self.generation) if persisted else None
+            # Rollups persisted by an older version may lack newer tables
+            if stored_rollups is not None and not set(ROLLUP_TABLES) <= set(stored_rollups):
+                stored_rollups = None
+            if stored_rollups is not None:
+                with self._lock:
+                    self._rollups, self._rollups_complete = stored_rollups, True
+
+            sources = self._sources()
+            self.bytes_total = sum(size for size, _ in sources)
+            for size, read in sources:
+                with span('load.partition'):
+                    part = read()
+                apply_schema(part, RAW_SCHEMA)
+                preprocess_crash_data(part, report=False)
+                rollup = build_rollup_cube(part) if stored_rollups is None else None
+                with self._lock:
+                    self._parts.append(part)
+                    if rollup is not None:
+                        self._rollup_parts.append(rollup)
+                        self._rollups = None
+                    self.rows_loaded += len(part)
+                    self.bytes_loaded += size
+
+            df = concat_crash_parts(self._parts)
+            self._parts = []
+            df.sort_values('CRASH_DATE', kind='stable', ignore_index=True, inplace=True)
+            rollups = stored_rollups
+            if rollups is None:
+                rollups = combine_rollups(self._rollup_parts)
+                if persisted:
+                    crash_store.save_rollups(rollups, self.generation)
+            self.dataset = SharedDataset(df, rollups)
+            with self._lock:
+                self._rollups, self._rollups_complete = rollups, True
+                self._rollup_parts = []
+            self.full_load_seconds = time.perf_counter() - self.started
+            print(f"Crash data fully loaded in {self.full_load_seconds:.1f}s ({self.rows_loaded:,} rows)")
+            if persisted:
+                scheduler.submit(f'snapshot:generation={self.generation}', self.publish, self.generation)
+            return self.dataset
+        except Exception as e:
+            self.error = e
+            raise
+        finally:
+            self._done.set()
 
+    def check_for_updates(self):
+        # Called on every rerun: a stat of the manifest, read only when it
+        # changed. Newer generations are appended on a preload worker and the
+        # next rerun picks up the new dataset.
+        if self.generation is None or not self.done or self.error is not None:
+            return
+        try:
+            mtime = os.path.getmtime(os.path.join(crash_store.STORE_DIR, crash_store.MANIFEST))
+        except OSError:
+            return
+        if mtime == self._manifest_mtime:
+            return
+        self._manifest_mtime = mtime
+        generation = crash_store.store_generation()
+        if generation is not None and generation > self.generation:
+            scheduler.submit(f'dataset:generation={generation}', self.refresh)
+
+    def refresh(self):
+        # Appends the rows of every generation ingested since the load; only
+        # those rows are read and preprocessed
+        with self._refresh_lock:
+            start = time.perf_counter()
+            manifest = crash_store.read_manifest()
+            if manifest['generation'] > self.generation and self._map_snapshot(manifest['generation']):
+                print(f"Mapped generation {self.generation} in {time.perf_counter() - start:.2f}s")
+                scheduler.submit(f'spatial_grid:generation={self.generation}', lambda: self.dataset.spatial_grid)
+                return self.dataset
+            deltas = [d for d in manifest.get('deltas', []) if d['generation'] > self.generation]
+            part = crash_store.read_deltas(deltas, columns=list(CRASH_SCHEMA))
+            if part is None:
+                return self.dataset
+            apply_schema(part, RAW_SCHEMA)
+            preprocess_crash_data(part, report=False)
+            dataset = self.dataset
+            df = append_crash_rows(dataset._df, part)
+            rollups = combine_rollups([dataset.rollups, build_rollup_cube(part)])
+            self.dataset = SharedDataset(df, rollups)
+            with self._lock:
+                self._rollups = rollups
+                self.rows_loaded += len(part)
+            self.generation = deltas[-1]['generation']
+            print(f"Appended generation {self.generation}: {len(part):,} rows in {time.perf_counter() - start:.1f}s")
+            scheduler.submit(f'spatial_grid:generation={self.generation}', lambda: self.dataset.spatial_grid)
+            scheduler.submit(f'snapshot:generation={self.generation}', self.publish, self.generation)
+            return self.dataset
+
+    def _map_snapshot(self, generation):
+        # Swaps in the published snapshot of `generation` if there is one;
+        # pyarrow is only imported once there is a store to map
+        import dataset_snapshot
+        snapshot = dataset_snapshot.open_snapshot(generation)
+        if snapshot is None or not set(ROLLUP_TABLES) <= set(snapshot[1]):
+            return False
+        df, rollups, derived = snapshot
+        self.dataset = SharedDataset(df, rollups, derived)
+        with self._lock:
+            self._rollups, self._rollups_complete = rollups, True
+            self.rows_loaded = len(df)
+        self.generation = generation
+        return True
+
+    def publish(self, generation):
+        # Shares this process's dataset, with its filter and spatial arrays,
+        # with the other replicas on the host, then maps the snapshot too, so
+        # the private copy is freed once no session holds a view of it
+        with self._refresh_lock:
+            dataset = self.dataset
+            if self.generation != generation:
+                return
+            import dataset_snapshot
+            if generation not in dataset_snapshot.published_generations():
+                dataset_snapshot.publish_snapshot(dataset._df, dataset.rollups, generation,
+                                                  derived=dataset.derived_arrays())
+            if self._map_snapshot(generation):
+                print(f"Published crash data generation {generation}; now mapped from the snapshot")
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def progress(self):
+        return self.bytes_loaded / self.bytes_total if self.bytes_total else 0.0
+
+    def partial_rollups(self):
+        # Returns (rollups or None, complete)
+        with self._lock:
+            if self._rollups is None and self._rollup_parts:
+                self._rollups = combine_rollups(self._rollup_parts)
+            return self._rollups, self._rollups_complete
+
+    def mark_first_chart(self):
+        if self.first_chart_seconds is None:
+            self.first_chart_seconds = time.perf_counter() - self.started
+            print(f"Time to first chart: {self.first_chart_seconds:.1f}s")
+
+    def wait(self, timeout=None):
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.dataset
+
+    def result(self):
+        if not self.done:
+            progress = st.progress(0.0, text="Loading crash data...")
+            while not self._done.wait(0.25):
+                progress.progress(self.progress, text=f"Loading crash data... {self.rows_loaded:,} rows")
+            progress.empty()
+        if self.error is not None:
+            raise self.error
+        return self.dataset
+
+
+@st.cache_resource
+def _dataset_loader():
+    loader = ProgressiveDatasetLoader()
+    scheduler.submit('dataset', loader.run)
+    return loader
+
+
+def get_dataset_loader():
+    loader = _dataset_loader()
+    if loader.done and loader.error is not None:
+        # The rerun that hit the error has reported it; a failed loader is
+        # not kept, so this one starts a fresh load instead of re-raising
+        # the same exception until the process restarts
+        _dataset_loader.clear()
+        loader = _dataset_loader()
+    return loader
+
+
+def load_shared_dataset():
+    loader = get_dataset_loader()
+    dataset = loader.result()
+    loader.check_for_updates()
+    return dataset
+
+
+def concat_crash_parts(parts):
+    # Each part is categorized with its own categories, and concat would turn
+    # columns whose categories differ back into objects. Every part gets the
+    # union of the categories first, so the columns stay categorical.
+    for col in parts[0].columns:
+        dtypes = [part[col].dtype for part in parts]
+        if not all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes) or \
+                all(dtype == dtypes[0] for dtype in dtypes):
+            continue
+        categories = dtypes[0].categories
+        for dtype in dtypes[1:]:
+            categories = categories.union(dtype.categories)
+        for part in parts:
+            part[col] = part[col].cat.set_categories(categories)
+    return pd.concat(parts, ignore_index=True)
+
+
+def append_crash_rows(df, part):
+    # df and part are both in date order, so the stable sort is close to a
+    # merge. Categories are extended rather than recast over the whole frame.
+    df = df.copy(deep=False)
+    part = part.reindex(columns=df.columns)
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            new_values = pd.Index(part[col].dropna().unique()).difference(dtype.categories)
+            if len(new_values):
+                df[col] = df[col].cat.add_categories(new_values)
+            part[col] = pd.Categorical(part[col], dtype=df[col].dtype)
+    combined = pd.concat([df, part], ignore_index=True)
+    combined.sort_values('CRASH_DATE', kind='stable', ignore_index=True, inplace=True)
+    return combined
+
+
+_preloads_lock = threading.Lock()
+_preloads_started = False
+
+
+def start_preloads():
+    # Warm the dataset, the map grid and the configured models once per
+    # process. Home calls this on every rerun, including the polling reruns
+    # while data is partial, so later calls return straight away.
+    global _preloads_started
+    with _preloads_lock:
+        if _preloads_started:
+            return
+        _preloads_started = True
+    loader = get_dataset_loader()
+    scheduler.submit('spatial_grid', lambda: loader.wait().spatial_grid)
+    # With a model server running, pages here only load the small encoders
+    if model_client.server_stats() is not None:
+        return
+    for name in PREWARM_MODELS:
+        if name in registry.names() and registry.is_available(name):
+            scheduler.submit(f'model:{name}', registry.load, name)
+
+
+@timed('filter.filter_data')
 def filter_data(df, start_date, end_date, weather, severity):
     filtered = df[(df['CRASH_DATE'] >= pd.to_datetime(start_date)) & (df['CRASH_DATE'] <= pd.to_datetime(end_date))]
     if weather != 'All':
@@ -61,20 +526,85 @@ def filter_data(df, start_date, end_date, weather, severity):
         filtered = filtered[(filtered['INJURIES_TOTAL'] > 0) & (filtered['INJURIES_TOTAL'] <= 3)]
     return filtered
 
-@st.cache_resource
-def load_map_html():
-    with open("chicago_map.html", "r", encoding="utf-8") as f:
-        return f.read()
 
+class CrashFilterEngine:
+    # Same results as filter_data, for a frame sorted by CRASH_DATE: the date
+    # range is two binary searches, weather uses per-value row index arrays and
+    # severity a precomputed class code, so rows are only taken once.
+    def __init__(self, df, cache_size=32):
+        dates = df['CRASH_DATE'].to_numpy()
+        weather = df['WEATHER_CONDITION'].astype('category')
+        codes = weather.cat.codes.to_numpy()
+        order = np.argsort(codes, kind='stable')
+        self._setup(df, weather.cat.categories, cache_size, {
+            # NaT dates sort last and are never in a date range
+            'dated_rows': np.array([len(dates) - int(np.isnat(dates).sum())]),
+            'severity': severity_classes(df['INJURIES_TOTAL']),
+            'weather_order': order,
+            'weather_bounds': np.searchsorted(codes[order], np.arange(len(weather.cat.categories) + 1)),
+        })
 
-@st.cache_resource
-def load_large_html_map():
-    progress_placeholder = st.empty()
-    for i in range(100):  # Simulate progress loading
-        progress_placeholder.progress(i + 1)
-        time.sleep(0.01)  # Adjust this if needed
-    progress_placeholder.empty()
-    
-    with open("chicago_map.html", "r", encoding="utf-8") as f:
-        return f.read()
+    @classmethod
+    def from_arrays(cls, df, arrays, cache_size=32):
+        # The engine arrays() came from, for the same frame, without sorting
+        # it by weather again
+        engine = cls.__new__(cls)
+        engine._setup(df, df['WEATHER_CONDITION'].astype('category').cat.categories, cache_size, arrays)
+        return engine
+
+    def _setup(self, df, categories, cache_size, arrays):
+        self._df = df
+        self._arrays = arrays
+        self._dates = df['CRASH_DATE'].to_numpy()[:int(arrays['dated_rows'][0])]
+        self._severity = arrays['severity']
+        order, bounds = arrays['weather_order'], arrays['weather_bounds']
+        if len(self._severity) != len(df) or len(bounds) != len(categories) + 1:
+            raise ValueError('filter engine arrays were saved for another frame')
+        self._weather_rows = {value: order[bounds[i]:bounds[i+1]] for i, value in enumerate(categories)}
+
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def arrays(self):
+        # The row index arrays, so a snapshot can store them with the frame
+        return dict(self._arrays)
+
+    def _row_selection(self, start_date, end_date, weather, severity):
+        start = np.datetime64(pd.to_datetime(start_date), 'ns')
+        end = np.datetime64(pd.to_datetime(end_date), 'ns')
+        lo = np.searchsorted(self._dates, start, side='left')
+        hi = max(lo, np.searchsorted(self._dates, end, side='right'))
+        if weather == 'All' and severity not in SEVERITY_CLASSES:
+            return slice(lo, hi)
+
+        if weather == 'All':
+            rows = np.arange(lo, hi)
+        else:
+            rows = self._weather_rows.get(weather, np.empty(0, dtype=np.intp))
+            rows = rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+        if severity in SEVERITY_CLASSES:
+            rows = rows[self._severity[rows] == SEVERITY_CLASSES[severity]]
+        return rows
+
+    def rows(self, start_date, end_date, weather, severity):
+        # Positions of the matching rows: a slice or a sorted index array
+        key = (pd.to_datetime(start_date), pd.to_datetime(end_date), weather, severity)
+        with self._lock:
+            rows = self._cache.get(key)
+            if rows is not None:
+                self._cache.move_to_end(key)
+        if rows is None:
+            with span('filter.rows'):
+                rows = self._row_selection(start_date, end_date, weather, severity)
+            with self._lock:
+                self._cache[key] = rows
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return rows
 
+    def filter(self, start_date, end_date, weather, severity):
+        rows = self.rows(start_date, end_date, weather, severity)
+        if isinstance(rows, slice):
+            return self._df.iloc[rows]
+        return self._df.take(rows)